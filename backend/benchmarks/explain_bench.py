@@ -0,0 +1,84 @@
+# backend/benchmarks/explain_bench.py
+"""
+Latency of Grad-CAM heatmaps against plain prediction.
+
+Times one forward pass as served (``predict``: normalization plus the
+backend's compiled model call) and the bare compiled call (``call``)
+against the Grad-CAM pass (forward plus backward and heatmap encoding,
+``explain``) over decoded images at several batch sizes; the overhead
+column is explain against call. Then single requests end to end through ModelService
+(decode, micro-batcher, result building) with and without ``explain``.
+Plain predictions take the same path whether or not heatmaps are enabled,
+so the overhead applies only to requests that ask for one.
+
+--model is "synthetic" (a small Keras CNN with the real 224x224x3 -> 4
+classes signature) or the path of a Keras model.
+
+Run from backend/:  python -m benchmarks.explain_bench --model src/brain_tumor/models/brain_tumor_model.h5
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.load_test import TEST_IMAGE, build_synthetic_model
+from src.brain_tumor.services.model_service import ModelService
+from src.brain_tumor.services.preprocessing import to_model_input
+
+def measure_ms(fn, iterations):
+    fn()  # warm up, including graph tracing
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1000.0
+
+async def measure_requests_ms(request, iterations):
+    await request()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await request()
+    return (time.perf_counter() - started) / iterations * 1000.0
+
+async def run(args):
+    model_path = args.model
+    if model_path == "synthetic":
+        model_path = str(Path(tempfile.mkdtemp()) / "synthetic_model.h5")
+        build_synthetic_model(model_path)
+    service = ModelService(model_path=model_path, backend_name="keras")
+    await service.load_model()
+
+    rng = np.random.default_rng(0)
+    import tensorflow as tf
+    keras_model = service.model.model
+    forward = tf.function(lambda x: keras_model(x, training=False), reduce_retracing=True)
+    print(f"{'batch':>5} {'predict ms':>11} {'call ms':>9} {'explain ms':>11} {'overhead':>9}")
+    for batch_size in args.batch_sizes:
+        pixels = [rng.integers(0, 256, (1, *service.image_size, 3), dtype=np.uint8) for _ in range(batch_size)]
+        img_batch = to_model_input(pixels)
+        predict_ms = measure_ms(lambda: service._predict_pixels(pixels), args.iterations)
+        call_ms = measure_ms(lambda: forward(img_batch).numpy(), args.iterations)
+        explain_ms = measure_ms(lambda: service._explain_pixels(pixels), args.iterations)
+        print(f"{batch_size:>5} {predict_ms:>11.2f} {call_ms:>9.2f} {explain_ms:>11.2f} {explain_ms / call_ms:>8.2f}x")
+
+    image_bytes = TEST_IMAGE.read_bytes()
+    predict_ms = await measure_requests_ms(lambda: service.predict_image(image_bytes), args.iterations)
+    explain_ms = await measure_requests_ms(lambda: service.explain_image(image_bytes), args.iterations)
+    print(f"\nsingle request: predict_image {predict_ms:.2f} ms, explain_image {explain_ms:.2f} ms "
+          f"(+{explain_ms - predict_ms:.2f} ms, {explain_ms / predict_ms:.2f}x)")
+    _, heatmap = await service.explain_image(image_bytes)
+    print(f"heatmap: {heatmap['width']}x{heatmap['height']} PNG, {len(heatmap['data'])} base64 bytes")
+    await service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="synthetic", help="synthetic or a Keras model path")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# backend/benchmarks/load_test.py
+"""
+Load test for the prediction API.
+
+Drives /api/v1/predict/, /api/v1/predictions/ and /api/v1/statistics/ at a
+sweep of concurrency levels and upload sizes, and reports req/s, p50/p95/p99
+latency and process RSS for every combination.
+
+By default the app runs in-process with mongomock-motor in place of MongoDB
+and a model chosen by --model:
+  stub       no TensorFlow; returns fixed probabilities after --stub-latency-ms
+  synthetic  a tiny Keras CNN with the real 224x224x3 -> 4 classes signature
+  <path>     any model file usable by INFERENCE_BACKEND
+With --url the same load is sent to a running server instead.
+
+--save-baseline writes the results as JSON; --baseline compares against such
+a file and exits 1 when req/s drops or p99 grows by more than --tolerance.
+
+Run from backend/:
+    python -m benchmarks.load_test --model stub --concurrency 1 8 32 --save-baseline baseline.json
+    python -m benchmarks.load_test --model stub --concurrency 1 8 32 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Imports nothing that reads settings, so configure_in_process can still set the environment
+from src.brain_tumor.services.backends import InferenceBackend
+
+TEST_IMAGE = Path(__file__).resolve().parent.parent / "src/brain_tumor/static/test_image.jpg"
+API = "/api/v1"
+
+class StubBackend(InferenceBackend):
+    """Inference backend that sleeps instead of running a model."""
+    name = "stub"
+    latency_s = 0.005
+
+    def load(self):
+        pass
+
+    def predict(self, img_batch):
+        time.sleep(self.latency_s)
+        probabilities = np.array([0.7, 0.1, 0.1, 0.1], dtype=np.float32)
+        return np.tile(probabilities, (len(img_batch), 1))
+
+    def summary(self, print_fn=print):
+        print_fn("stub backend")
+
+def build_synthetic_model(path):
+    import tensorflow as tf
+    model = tf.keras.Sequential([
+        tf.keras.Input((224, 224, 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=2, activation="relu"),
+        tf.keras.layers.Conv2D(16, 3, strides=2, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(4, activation="softmax"),
+    ])
+    model.save(path)
+
+def make_image(edge):
+    rng = np.random.default_rng(edge)
+    pixels = rng.integers(0, 255, size=(edge, edge, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    scale = 1024.0 * 1024.0 if platform.system() == "Darwin" else 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def configure_in_process(args):
+    """Point settings at the chosen model and swap Motor for mongomock before importing the app."""
+    if args.model == "stub":
+        os.environ["INFERENCE_BACKEND"] = "stub"
+        os.environ["MODEL_PATH"] = "stub"
+    elif args.model == "synthetic":
+        path = Path(tempfile.mkdtemp()) / "synthetic_model.h5"
+        build_synthetic_model(path)
+        os.environ["INFERENCE_BACKEND"] = "keras"
+        os.environ["MODEL_PATH"] = str(path)
+    else:
+        os.environ["MODEL_PATH"] = args.model
+    if not args.with_cache:
+        os.environ["PREDICTION_CACHE_ENABLED"] = "False"
+
+    from src.brain_tumor.services import backends
+    StubBackend.latency_s = args.stub_latency_ms / 1000.0
+    backends.BACKENDS["stub"] = StubBackend
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("In-process mode needs mongomock-motor (pip install mongomock-motor), or pass --url")
+    patch_mongomock()
+    from src.brain_tumor import database
+    database.client = AsyncMongoMockClient()
+
+    from src.brain_tumor.main import app
+    return app
+
+def patch_mongomock():
+    """mongomock's bulk_write predates newer pymongo UpdateOne fields; apply updates one by one."""
+    import mongomock.collection
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        for request in requests:
+            self.update_one(request._filter, request._doc, upsert=request._upsert)
+
+    mongomock.collection.Collection.bulk_write = bulk_write
+
+async def run_level(client, make_request, concurrency, total):
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await make_request()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_sec": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+def scenarios(client, images):
+    for name, image_bytes in images.items():
+        files = {"file": (f"{name}.jpg", image_bytes, "image/jpeg")}
+        yield f"predict[{name}]", lambda files=files: client.post(f"{API}/predict/", files=files)
+    yield "predictions", lambda: client.get(f"{API}/predictions/", params={"limit": 10})
+    yield "statistics", lambda: client.get(f"{API}/statistics/")
+
+async def run(args):
+    import httpx
+
+    images = {"test_image": TEST_IMAGE.read_bytes()}
+    for edge in args.image_sizes:
+        images[f"{edge}px"] = make_image(edge)
+
+    results = {}
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        lifespan = None
+    else:
+        app = configure_in_process(args)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        # Wait for the startup warm-up so it is not measured
+        while (await client.get("/health")).status_code != 200:
+            await asyncio.sleep(0.1)
+
+    try:
+        for name, make_request in scenarios(client, images):
+            for concurrency in args.concurrency:
+                key = f"{name}@c{concurrency}"
+                await run_level(client, make_request, concurrency, min(args.requests, 2 * concurrency))
+                results[key] = await run_level(client, make_request, concurrency, args.requests)
+                row = results[key]
+                print(f"{key:<28} {row['req_per_sec']:>9.1f} req/s  p50={row['p50_ms']:>8.2f}  "
+                      f"p95={row['p95_ms']:>8.2f}  p99={row['p99_ms']:>8.2f} ms  "
+                      f"errors={row['errors']}  rss={row['rss_mb']:.0f} MB")
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions against a saved baseline."""
+    regressions = []
+    for key, row in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if row["req_per_sec"] < reference["req_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: {row['req_per_sec']} req/s < baseline {reference['req_per_sec']}")
+        if row["p99_ms"] > reference["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p99 {row['p99_ms']} ms > baseline {reference['p99_ms']}")
+        if row["errors"] > reference["errors"]:
+            regressions.append(f"{key}: {row['errors']} errors > baseline {reference['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--model", default="stub", help="stub, synthetic or a model path (in-process only)")
+    parser.add_argument("--stub-latency-ms", type=float, default=5.0)
+    parser.add_argument("--with-cache", action="store_true", help="keep the prediction cache enabled")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--image-sizes", type=int, nargs="*", default=[256, 1024])
+    parser.add_argument("--requests", type=int, default=200, help="requests per level")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--save-baseline", help="write results JSON as a baseline")
+    parser.add_argument("--baseline", help="fail when results regress against this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {"python": platform.python_version(), "model": args.model, "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(report, indent=2))
+            print(f"Wrote {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
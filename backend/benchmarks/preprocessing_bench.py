@@ -0,0 +1,88 @@
+# backend/benchmarks/preprocessing_bench.py
+"""
+Micro-benchmark of image preprocessing: the original PIL -> float32 path
+against services/preprocessing.py. Reports per-image latency and peak traced
+memory for the bundled test image and a large generated JPEG. Peak memory
+comes from tracemalloc, which sees numpy buffers but not Pillow's internal
+image storage.
+
+Run from backend/:  python -m benchmarks.preprocessing_bench
+"""
+import argparse
+import io
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from src.brain_tumor.services.preprocessing import BatchBuffer, decode_image, to_model_input
+
+IMAGE_SIZE = (224, 224)
+TEST_IMAGE = Path(__file__).resolve().parent.parent / "src/brain_tumor/static/test_image.jpg"
+
+def legacy_preprocess(image_bytes):
+    """The original predict_image path: convert, resize, float32 copy, expand_dims, /255."""
+    image = Image.open(io.BytesIO(image_bytes))
+    image = image.convert("RGB")
+    image = image.resize(IMAGE_SIZE)
+    img_array = np.asarray(image, dtype=np.float32)  # same as keras img_to_array
+    img_array = np.expand_dims(img_array, axis=0)
+    return img_array / 255.0
+
+def new_preprocess(image_bytes):
+    return to_model_input([decode_image(image_bytes, IMAGE_SIZE)])
+
+def new_preprocess_buffered(image_bytes, buffer):
+    return buffer.fill([decode_image(image_bytes, IMAGE_SIZE)])
+
+def synthetic_jpeg(size):
+    rng = np.random.default_rng(0)
+    # Smooth gradient plus noise compresses like a real scan rather than pure noise
+    y, x = np.mgrid[0:size[1], 0:size[0]]
+    base = ((x + y) / (size[0] + size[1]) * 255).astype(np.uint8)
+    noise = rng.integers(0, 32, size=(size[1], size[0]), dtype=np.uint8)
+    gray = base // 2 + noise
+    buf = io.BytesIO()
+    Image.fromarray(gray, mode="L").convert("RGB").save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+def measure(fn, image_bytes, iterations):
+    fn(image_bytes)  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(image_bytes)
+    latency_ms = (time.perf_counter() - started) / iterations * 1000.0
+
+    tracemalloc.start()
+    fn(image_bytes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latency_ms, peak / 1024.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--large-size", type=int, default=2048, help="edge of the generated JPEG")
+    args = parser.parse_args()
+
+    buffer = BatchBuffer(1, IMAGE_SIZE)
+    images = {
+        "test_image.jpg": TEST_IMAGE.read_bytes(),
+        f"synthetic {args.large_size}px": synthetic_jpeg((args.large_size, args.large_size)),
+    }
+    paths = {
+        "legacy": legacy_preprocess,
+        "preprocessing": new_preprocess,
+        "preprocessing+buffer": lambda b: new_preprocess_buffered(b, buffer),
+    }
+
+    print(f"{'image':<22} {'path':<22} {'ms/image':>10} {'peak KiB':>10}")
+    for image_name, image_bytes in images.items():
+        for path_name, fn in paths.items():
+            latency_ms, peak_kib = measure(fn, image_bytes, args.iterations)
+            print(f"{image_name:<22} {path_name:<22} {latency_ms:>10.2f} {peak_kib:>10.0f}")
+
+if __name__ == "__main__":
+    main()
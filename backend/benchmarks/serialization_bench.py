@@ -0,0 +1,170 @@
+# backend/benchmarks/serialization_bench.py
+"""
+Micro-benchmark of response building and serialization: the original
+dict-copy + jsonable_encoder + json.dumps path against the response models
+rendered by ORJSONResponse, and against rendering plain dicts with orjson
+directly. Covers a /predict/ response, history pages and a batch response,
+and reports microseconds per response.
+
+"response model" is what FastAPI does for endpoints with a response_model and
+ORJSONResponse as the default class: validate, dump to JSON-mode Python, render.
+
+Run from backend/:  python -m benchmarks.serialization_bench
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy as np
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from src.brain_tumor.models.prediction import DetailedPredictionResponse, PredictionResult
+from src.brain_tumor.services.model_service import ModelService
+from src.brain_tumor.services.prediction_history import format_prediction
+from src.brain_tumor.services.serialization import ORJSONResponse, orjson
+
+CLASSES = {0: "glioma", 1: "meningioma", 2: "notumor", 3: "pituitary"}
+
+def legacy_tumor_info(class_name):
+    """The original get_tumor_info, which rebuilt its dict on every call."""
+    tumor_info = {
+        "glioma": "A tumor that originates from glial cells in the brain or spine.",
+        "meningioma": "A tumor that forms on membranes covering the brain and spinal cord.",
+        "notumor": "No evidence of tumor detected in the brain scan.",
+        "pituitary": "A growth in the pituitary gland, which may affect hormone levels."
+    }
+    return tumor_info.get(class_name, "Unknown tumor type.")
+
+def legacy_build_result(row):
+    class_index = int(np.argmax(row))
+    class_name = CLASSES[class_index]
+    probabilities = {}
+    for i in range(len(row)):
+        probabilities[CLASSES[i]] = float(row[i])
+    has_tumor = class_name != "notumor"
+    return {
+        "prediction": class_name,
+        "confidence": float(row[class_index]),
+        "model_accuracy": 98.0,
+        "diagnosis": "Brain tumor detected." if has_tumor else "No tumor detected.",
+        "tumor_type": class_name.capitalize() + " Tumor" if has_tumor else "N/A",
+        "tumor_info": legacy_tumor_info(class_name),
+        "class_probabilities": probabilities
+    }
+
+def legacy_render(content):
+    """FastAPI without a response_model: jsonable_encoder, then JSONResponse's json.dumps."""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+def legacy_predict(row, prediction_id):
+    result = legacy_build_result(row)
+    response = {
+        "prediction": result["prediction"],
+        "confidence": result["confidence"],
+        "model_accuracy": result["model_accuracy"],
+        "diagnosis": result["diagnosis"],
+        "tumor_type": result["tumor_type"],
+        "tumor_info": result["tumor_info"],
+        "class_probabilities": result["class_probabilities"],
+        "_id": str(prediction_id)
+    }
+    return legacy_render(response)
+
+def legacy_history(docs):
+    items = []
+    for doc in docs:
+        item = format_prediction(doc, legacy_tumor_info)
+        item["_id"] = str(item["_id"])
+        items.append(item)
+    return legacy_render(items)
+
+def model_renderer(adapter, **dump_options):
+    """Validate, dump and render the way FastAPI does for a response_model."""
+    def render(content):
+        value = adapter.validate_python(content)
+        return ORJSONResponse(None).render(adapter.dump_python(value, mode="json", by_alias=True, **dump_options))
+    return render
+
+def make_docs(count):
+    rng = np.random.default_rng(0)
+    started = datetime(2025, 1, 1)
+    docs = []
+    for i in range(count):
+        row = rng.dirichlet(np.ones(4)).astype(np.float32)
+        result = legacy_build_result(row)
+        docs.append({
+            "_id": ObjectId(),
+            "image_name": f"slice_{i}.jpg",
+            "prediction": result["prediction"],
+            "confidence": result["confidence"],
+            "prediction_date": started + timedelta(minutes=i),
+            "model_version": "v1",
+            "full_result": result,
+        })
+    return docs
+
+def measure(fn, iterations):
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed; ORJSONResponse falls back to the stdlib json module\n")
+
+    service = ModelService(model_path="unused", class_dict_path="unused")
+    service.classes = CLASSES
+    row = np.array([0.61, 0.2, 0.09, 0.1], dtype=np.float32)
+    prediction_id = ObjectId()
+    render_result = model_renderer(TypeAdapter(PredictionResult))
+    render_page = model_renderer(TypeAdapter(List[DetailedPredictionResponse]), exclude_unset=True)
+    dumps = ORJSONResponse(None).render
+
+    # (name, items per response, paths)
+    cases = [
+        ("predict", 1, {
+            "legacy": lambda: legacy_predict(row, prediction_id),
+            "response model": lambda: render_result({**service._build_result(row), "_id": prediction_id}),
+            "orjson direct": lambda: dumps({**service._build_result(row), "_id": prediction_id}),
+        }),
+    ]
+    for page_size in args.page_sizes:
+        docs = make_docs(page_size)
+        cases.append((f"history[{page_size}]", page_size, {
+            "legacy": lambda docs=docs: legacy_history(docs),
+            "response model": lambda docs=docs: render_page(
+                [format_prediction(doc, service.get_tumor_info) for doc in docs]
+            ),
+            "orjson direct": lambda docs=docs: dumps(
+                [format_prediction(doc, service.get_tumor_info) for doc in docs]
+            ),
+        }))
+    slices = [{"image_name": d["image_name"], **d["full_result"], "_id": d["_id"]} for d in make_docs(256)]
+    cases.append(("batch[256]", len(slices), {
+        "legacy": lambda: legacy_render({"slices": [{**s, "_id": str(s["_id"])} for s in slices]}),
+        "orjson direct": lambda: dumps({"slices": slices}),
+    }))
+
+    print(f"{'response':<14} {'path':<16} {'us/response':>12} {'speedup':>8}")
+    for case_name, items, paths in cases:
+        iterations = max(10, args.iterations // items)
+        baseline = None
+        for path_name, fn in paths.items():
+            micros = measure(fn, iterations)
+            baseline = baseline or micros
+            print(f"{case_name:<14} {path_name:<16} {micros:>12.1f} {baseline / micros:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
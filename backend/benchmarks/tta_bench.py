@@ -0,0 +1,81 @@
+# backend/benchmarks/tta_bench.py
+"""
+Latency overhead of test-time augmentation and ensembles.
+
+Single requests end to end through ModelService (decode, forward pass,
+result building): a plain ``predict_image`` against ``predict_image_tta``
+with 1..N views of the TTA_VIEWS setting, which stacks all views into one
+batched forward pass, and against the same views scored as N sequential
+``predict_image`` calls. Then the ensemble: every view on two model versions
+(the same weights loaded twice), whose batched passes run concurrently.
+
+--model is "synthetic" (a small Keras CNN with the real 224x224x3 -> 4
+classes signature) or the path of a Keras model.
+
+Run from backend/:  python -m benchmarks.tta_bench --model src/brain_tumor/models/brain_tumor_model.h5
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.load_test import TEST_IMAGE, build_synthetic_model
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.services.model_service import ModelService
+from src.brain_tumor.services.preprocessing import parse_tta_views
+
+async def measure_requests_ms(request, iterations):
+    await request()  # warm up, including graph tracing for the batch shape
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await request()
+    return (time.perf_counter() - started) / iterations * 1000.0
+
+async def run(args):
+    model_path = args.model
+    if model_path == "synthetic":
+        model_path = str(Path(tempfile.mkdtemp()) / "synthetic_model.h5")
+        build_synthetic_model(model_path)
+    service = ModelService(model_path=model_path, model_version="v1", backend_name="keras")
+    member = ModelService(model_path=model_path, model_version="v2", backend_name="keras", pool=service.pool)
+    await service.load_model()
+    await member.load_model()
+
+    image_bytes = TEST_IMAGE.read_bytes()
+    views = parse_tta_views(args.views or get_settings().TTA_VIEWS)
+    plain_ms = await measure_requests_ms(lambda: service.predict_image(image_bytes), args.iterations)
+    print(f"plain predict_image: {plain_ms:.2f} ms\n")
+
+    async def sequential():
+        for _ in views_used:
+            await service.predict_image(image_bytes)
+
+    print(f"{'views':>5} {'batched ms':>11} {'overhead':>9} {'sequential ms':>14} {'overhead':>9}")
+    for count in range(1, len(views) + 1):
+        views_used = views[:count]
+        batched_ms = await measure_requests_ms(lambda: service.predict_image_tta(image_bytes, views_used),
+                                               args.iterations)
+        sequential_ms = await measure_requests_ms(sequential, args.iterations)
+        print(f"{count:>5} {batched_ms:>11.2f} {batched_ms / plain_ms:>8.2f}x "
+              f"{sequential_ms:>14.2f} {sequential_ms / plain_ms:>8.2f}x")
+
+    ensemble_ms = await measure_requests_ms(
+        lambda: service.predict_image_tta(image_bytes, views, members=[member]), args.iterations
+    )
+    print(f"\nensemble of 2 versions x {len(views)} views: {ensemble_ms:.2f} ms ({ensemble_ms / plain_ms:.2f}x plain)")
+    result = await service.predict_image_tta(image_bytes, views, members=[member])
+    print(f"uncertainty {result['uncertainty']:.4f}, {result['ensemble']}")
+    await member.close()
+    await service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="synthetic", help="synthetic or a Keras model path")
+    parser.add_argument("--views", help="comma-separated TTA views (default: the TTA_VIEWS setting)")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# backend/scripts/convert_model.py
+"""
+Convert the Keras model to TFLite and/or ONNX with post-training INT8
+quantization, then check that the converted models agree with the original.
+
+Calibration images are read from --calibration-dir (any nested layout).
+The parity check reads --eval-dir laid out as <eval-dir>/<class_name>/*.jpg
+with the class names from class_dict.npy, and reports per-class accuracy for
+each backend plus top-1 agreement with Keras. The script exits non-zero when
+a converted model falls outside --max-accuracy-drop or --min-agreement.
+
+Run from backend/:
+    python -m scripts.convert_model --calibration-dir data/train --eval-dir data/test
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.services.backends import create_backend
+from src.brain_tumor.services.preprocessing import decode_image, to_model_input
+
+IMAGE_SIZE = (224, 224)
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+def list_images(directory, limit=None):
+    paths = sorted(p for p in Path(directory).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return paths[:limit] if limit else paths
+
+def load_batch(paths):
+    return to_model_input([decode_image(p.read_bytes(), IMAGE_SIZE) for p in paths])
+
+def load_class_names(class_dict_path):
+    """Return class names ordered by model output index."""
+    classes = np.load(class_dict_path, allow_pickle=True).item()
+    # class_dict.npy maps name -> index; tolerate the inverse layout too
+    if all(isinstance(k, str) for k in classes):
+        return [name for name, _ in sorted(classes.items(), key=lambda item: item[1])]
+    return [classes[i] for i in sorted(classes)]
+
+def representative_batches(paths, batch_size=8):
+    for start in range(0, len(paths), batch_size):
+        yield load_batch(paths[start:start + batch_size])
+
+def convert_tflite(keras_model, calibration_paths, output_path, int8):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if int8:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: (
+            [img[np.newaxis]] for batch in representative_batches(calibration_paths) for img in batch
+        )
+        # Integer kernels inside, float input/output so callers need no quantization params
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    output_path.write_bytes(converter.convert())
+
+def convert_onnx(keras_model, calibration_paths, output_path, int8):
+    try:
+        import tensorflow as tf
+        import tf2onnx
+    except ImportError:
+        raise RuntimeError("ONNX export requires tf2onnx (pip install tf2onnx onnxruntime)")
+    input_shape = (None, *IMAGE_SIZE[::-1], 3)
+    spec = (tf.TensorSpec(input_shape, tf.float32, name="input"),)
+    float_path = output_path.with_name(output_path.stem + ".float.onnx") if int8 else output_path
+    # from_keras does not understand Keras 3 models; trace a plain function instead
+    serve = tf.function(lambda x: keras_model(x, training=False), input_signature=spec)
+    tf2onnx.convert.from_function(serve, input_signature=spec, opset=17, output_path=str(float_path))
+    if not int8:
+        return
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.batches = representative_batches(calibration_paths)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {"input": batch}
+
+    quantize_static(
+        str(float_path), str(output_path), Reader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+def evaluate(backend, eval_set, batch_size=32):
+    """Return (predicted indices, images/sec) over the evaluation set."""
+    paths = [path for path, _ in eval_set]
+    predicted = []
+    elapsed = 0.0
+    for start in range(0, len(paths), batch_size):
+        batch = load_batch(paths[start:start + batch_size])
+        started = time.perf_counter()
+        outputs = backend.predict(batch)
+        elapsed += time.perf_counter() - started
+        predicted.extend(np.argmax(outputs, axis=1).tolist())
+    return np.array(predicted), len(paths) / elapsed if elapsed else 0.0
+
+def parity_report(results, labels, class_names):
+    reference = results["keras"][0]
+    report = {}
+    for name, (predicted, throughput) in results.items():
+        per_class = {}
+        for index, class_name in enumerate(class_names):
+            mask = labels == index
+            if mask.any():
+                per_class[class_name] = float((predicted[mask] == index).mean() * 100)
+        report[name] = {
+            "accuracy": float((predicted == labels).mean() * 100),
+            "agreement": float((predicted == reference).mean()),
+            "images_per_sec": throughput,
+            "per_class": per_class,
+        }
+    return report
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="Keras .h5/.keras model")
+    parser.add_argument("--classes", default=settings.CLASSES_PATH, help="class_dict.npy")
+    parser.add_argument("--output-dir", default=None, help="defaults to the model's directory")
+    parser.add_argument("--formats", nargs="+", choices=["tflite", "onnx"], default=["tflite"])
+    parser.add_argument("--no-int8", dest="int8", action="store_false", help="skip quantization")
+    parser.add_argument("--calibration-dir", help="images for INT8 calibration")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    parser.add_argument("--eval-dir", help="<eval-dir>/<class_name>/*.jpg for the parity check")
+    parser.add_argument("--max-accuracy-drop", type=float, default=1.0, help="percentage points")
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    if args.int8 and not args.calibration_dir:
+        parser.error("--calibration-dir is required for INT8 quantization")
+
+    model_path = Path(args.model)
+    output_dir = Path(args.output_dir) if args.output_dir else model_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    calibration_paths = list_images(args.calibration_dir, args.calibration_samples) if args.calibration_dir else []
+    suffix = ".int8" if args.int8 else ""
+
+    keras_backend = create_backend("keras", str(model_path))
+    keras_backend.load()
+
+    converted = {}
+    for fmt in args.formats:
+        output_path = output_dir / f"{model_path.stem}{suffix}.{fmt}"
+        print(f"Converting to {fmt} -> {output_path}")
+        converter = convert_tflite if fmt == "tflite" else convert_onnx
+        converter(keras_backend.model, calibration_paths, output_path, args.int8)
+        size_mb = output_path.stat().st_size / 1e6
+        print(f"  wrote {size_mb:.1f} MB (source {model_path.stat().st_size / 1e6:.1f} MB)")
+        converted[fmt] = output_path
+
+    if not args.eval_dir:
+        print("No --eval-dir given, skipping parity check")
+        return 0
+
+    class_names = load_class_names(args.classes)
+    eval_set = [
+        (path, index)
+        for index, class_name in enumerate(class_names)
+        for path in list_images(Path(args.eval_dir) / class_name)
+    ]
+    if not eval_set:
+        print(f"No images found under {args.eval_dir}/<{'|'.join(class_names)}>")
+        return 1
+    labels = np.array([index for _, index in eval_set])
+
+    results = {"keras": evaluate(keras_backend, eval_set)}
+    for fmt, path in converted.items():
+        backend = create_backend(fmt, str(path))
+        backend.load()
+        results[fmt] = evaluate(backend, eval_set)
+
+    report = parity_report(results, labels, class_names)
+    failed = False
+    print(f"\nParity on {len(eval_set)} images ({', '.join(class_names)})")
+    for name, row in report.items():
+        per_class = ", ".join(f"{c}={a:.1f}%" for c, a in row["per_class"].items())
+        print(f"  {name:<7} acc={row['accuracy']:.2f}% agree={row['agreement']:.4f} "
+              f"{row['images_per_sec']:.1f} img/s  [{per_class}]")
+        if name == "keras":
+            continue
+        if report["keras"]["accuracy"] - row["accuracy"] > args.max_accuracy_drop:
+            print(f"  FAIL: {name} accuracy dropped more than {args.max_accuracy_drop} points")
+            failed = True
+        if row["agreement"] < args.min_agreement:
+            print(f"  FAIL: {name} agrees with keras on fewer than {args.min_agreement:.0%} of images")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
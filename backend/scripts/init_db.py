@@ -1,24 +1,34 @@
 # backend/scripts/init_db.py
+"""
+Create the collections and indexes. The API ensures the same indexes at
+startup (MONGO_ENSURE_INDEXES); this is for preparing a database up front.
+
+Run from backend/:  python -m scripts.init_db
+"""
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import IndexModel, ASCENDING
+
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.database import create_client, ensure_indexes
 
 async def init_db():
-    client = AsyncIOMotorClient("mongodb://localhost:27017")
-    db = client.brain_tumor_db
+    settings = get_settings()
+    client = create_client(settings)
+    db = client[settings.DATABASE_NAME]
     
     # Create collections if they don't exist
-    if "predictions" not in await db.list_collection_names():
-        await db.create_collection("predictions")
-        print("Created 'predictions' collection")
-        
-        # Create indices
-        await db.predictions.create_index([("prediction_date", ASCENDING)])
-        print("Created index on prediction_date")
-    else:
-        print("'predictions' collection already exists")
+    existing = await db.list_collection_names()
+    for name in ("predictions", "prediction_stats"):
+        if name not in existing:
+            await db.create_collection(name)
+            print(f"Created '{name}' collection")
+        else:
+            print(f"'{name}' collection already exists")
+    
+    # History, prediction cache, per-version and rollup indexes (idempotent)
+    await ensure_indexes(db)
+    print("Ensured indexes")
     
     client.close()
 
 if __name__ == "__main__":
-    asyncio.run(init_db())
\ No newline at end of file
+    asyncio.run(init_db())
@@ -0,0 +1,31 @@
+# backend/scripts/rebuild_stats.py
+"""
+Recompute the prediction_stats counters (totals plus hourly and daily
+rollups) from the predictions collection.
+
+The new counters are written to a scratch collection and swapped in with a
+rename, so readers never see a half-built state. Predictions stored while
+the rebuild runs may be missed; run it during a quiet period. The API never
+rebuilds by itself: at startup it only creates the totals and logs a
+warning when older predictions are not counted yet.
+
+Run from backend/:  python -m scripts.rebuild_stats
+"""
+import asyncio
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.database import STATS_INDEXES, create_client
+from src.brain_tumor.services.stats_service import STATS_COLLECTION, rebuild_stats
+
+async def main():
+    settings = get_settings()
+    client = create_client(settings)
+    try:
+        summary = await rebuild_stats(client[settings.DATABASE_NAME], STATS_INDEXES)
+    finally:
+        client.close()
+    print(f"Counted {summary['total']} predictions, built {summary['hour']} hour "
+          f"and {summary['day']} day buckets")
+    print(f"Replaced '{STATS_COLLECTION}'")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,297 @@
+# backend/scripts/score_images.py
+"""
+Score a large set of MRI slices offline, without going through the HTTP API.
+
+Images come from --input-dir (walked recursively, in sorted order) or a
+--manifest with one path per line. They are read and decoded on a worker
+pool while earlier batches run through the model, with up to --prefetch
+batches in flight; each batch is one forward pass via ModelService.
+
+Results go to --output (.csv, or .parquet with pyarrow installed) and/or,
+with --mongo, to the predictions collection with insert_many, keeping the
+prediction_stats counters in step. --checkpoint records how far the run
+got after every flush, so an interrupted run resumes where it stopped by
+passing the same --checkpoint again. Output is at-least-once: at most the
+batches of one flush are repeated after a crash.
+
+Run from backend/:
+    python -m scripts.score_images --input-dir data/archive --output scores.csv --checkpoint scores.ckpt
+    python -m scripts.score_images --manifest slices.txt --mongo --batch-size 128 --executor process
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.database import create_client
+from src.brain_tumor.models.prediction import PredictionCreate
+from src.brain_tumor.services.model_service import ModelService
+from src.brain_tumor.services.prediction_cache import PredictionCache
+from src.brain_tumor.services.stats_service import StatsService
+from src.brain_tumor.services.worker_pool import WorkerPool
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+def list_inputs(input_dir=None, manifest=None):
+    """Return (path, name) pairs in a stable order, so checkpoints stay valid."""
+    if manifest:
+        base = Path(manifest).parent
+        lines = Path(manifest).read_text().splitlines()
+        paths = [Path(line.strip()) for line in lines if line.strip() and not line.startswith("#")]
+        return [(p if p.is_absolute() else base / p, str(p)) for p in paths]
+    root = Path(input_dir)
+    paths = sorted(p for p in root.rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return [(p, str(p.relative_to(root))) for p in paths]
+
+class Checkpoint:
+    """Index of the next unscored input plus running totals, stored as JSON."""
+    def __init__(self, path, source):
+        self.path = Path(path) if path else None
+        self.source = source
+        self.next_index = 0
+        self.scored = 0
+        self.failed = 0
+        if self.path and self.path.exists():
+            state = json.loads(self.path.read_text())
+            if state.get("source") != source:
+                raise SystemExit(f"Checkpoint {self.path} belongs to {state.get('source')}, not {source}")
+            self.next_index = state["next_index"]
+            self.scored = state["scored"]
+            self.failed = state["failed"]
+
+    def save(self):
+        if self.path is None:
+            return
+        state = {"source": self.source, "next_index": self.next_index, "scored": self.scored, "failed": self.failed}
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(state))
+        tmp.replace(self.path)  # atomic, so a crash never leaves a torn checkpoint
+
+class CsvSink:
+    def __init__(self, path, columns, append):
+        exists = append and Path(path).exists()
+        self.file = open(path, "a" if exists else "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=columns)
+        if not exists:
+            self.writer.writeheader()
+
+    async def write(self, rows, documents):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    async def close(self):
+        self.file.close()
+
+class ParquetSink:
+    """Parquet files cannot be appended to, so a resumed run writes a new part file."""
+    def __init__(self, path, columns, start_index):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow); use a .csv output instead")
+        self.pa = pa
+        path = Path(path)
+        if start_index:
+            path = path.with_name(f"{path.stem}.from-{start_index}{path.suffix}")
+        self.columns = columns
+        schema = pa.schema([
+            (name, pa.float64() if name == "confidence" or name.startswith("p_") else pa.string())
+            for name in columns
+        ])
+        self.writer = pq.ParquetWriter(str(path), schema)
+
+    async def write(self, rows, documents):
+        table = self.pa.Table.from_pylist([{c: row.get(c) for c in self.columns} for row in rows],
+                                          schema=self.writer.schema)
+        self.writer.write_table(table)
+
+    async def close(self):
+        self.writer.close()
+
+class MongoSink:
+    def __init__(self, settings):
+        self.client = create_client(settings)
+        self.db = self.client[settings.DATABASE_NAME]
+        self.stats = StatsService()
+
+    async def write(self, rows, documents):
+        if documents:
+            await self.db.predictions.insert_many(documents, ordered=False)
+            await self.stats.record(self.db, [(d["prediction"], d["prediction_date"]) for d in documents])
+
+    async def close(self):
+        self.client.close()
+
+async def score_batch(service, batch, batch_size):
+    """
+    Read and score one batch in forward passes of ``batch_size`` images;
+    returns [(name, image_bytes or None, result or exception)].
+    """
+    contents = await asyncio.gather(
+        *[asyncio.to_thread(path.read_bytes) for path, _ in batch], return_exceptions=True
+    )
+    readable = [i for i, c in enumerate(contents) if not isinstance(c, BaseException)]
+    results = list(contents)
+    if readable:
+        scored = await service.predict_images([contents[i] for i in readable], chunk_size=batch_size)
+        for i, result in zip(readable, scored):
+            results[i] = result
+    return [
+        (name, None if isinstance(c, BaseException) else c, r)
+        for (_, name), c, r in zip(batch, contents, results)
+    ]
+
+def to_outputs(service, class_names, scored):
+    rows, documents = [], []
+    for name, contents, result in scored:
+        if isinstance(result, BaseException):
+            rows.append({"path": name, "error": str(result)})
+            continue
+        row = {"path": name, "prediction": result["prediction"], "confidence": result["confidence"]}
+        for class_name in class_names:
+            row[f"p_{class_name}"] = result["class_probabilities"].get(class_name)
+        rows.append(row)
+        documents.append(PredictionCreate(
+            image_name=name,
+            prediction=result["prediction"],
+            confidence=result["confidence"],
+            full_result=result,
+            image_hash=PredictionCache.hash_bytes(contents),
+            model_version=service.model_version,
+        ).model_dump())
+    return rows, documents
+
+class Progress:
+    def __init__(self, total, done, interval):
+        self.total = total
+        self.done = done
+        self.interval = interval
+        self.started = self.last_time = time.perf_counter()
+        self.last_done = done
+        self.start_done = done
+
+    def update(self, done, force=False):
+        self.done = done
+        now = time.perf_counter()
+        if done == self.last_done or (not force and now - self.last_time < self.interval):
+            return
+        recent = (done - self.last_done) / max(now - self.last_time, 1e-9)
+        overall = (done - self.start_done) / max(now - self.started, 1e-9)
+        eta = (self.total - done) / overall if overall else float("inf")
+        print(f"{done}/{self.total} images  {recent:8.1f} img/s (now)  {overall:8.1f} img/s (avg)  "
+              f"eta {eta:7.0f}s", flush=True)
+        self.last_time, self.last_done = now, done
+
+async def run(args):
+    settings = get_settings()
+    inputs = list_inputs(args.input_dir, args.manifest)
+    if args.limit:
+        inputs = inputs[:args.limit]
+    checkpoint = Checkpoint(args.checkpoint, str(Path(args.manifest or args.input_dir).resolve()))
+    print(f"{len(inputs)} images, resuming at {checkpoint.next_index}" if checkpoint.next_index
+          else f"{len(inputs)} images")
+
+    pool = WorkerPool(kind=args.executor, workers=args.decode_workers,
+                      max_pending=args.prefetch + 1, retry_after=1)
+    service = ModelService(
+        model_path=args.model_path,
+        model_version=args.model_version,
+        class_dict_path=args.classes_path,
+        backend_name=args.backend,
+        pool=pool,
+    )
+    await service.load_model()
+    class_names = [service.get_class_name(i) for i in range(len(service.classes))]
+    columns = ["path", "prediction", "confidence"] + [f"p_{name}" for name in class_names] + ["error"]
+
+    sinks = []
+    if args.output:
+        if args.output.endswith(".parquet"):
+            sinks.append(ParquetSink(args.output, columns, checkpoint.next_index))
+        else:
+            sinks.append(CsvSink(args.output, columns, append=checkpoint.next_index > 0))
+    if args.mongo:
+        sinks.append(MongoSink(settings))
+    if not sinks:
+        raise SystemExit("Nothing to write: pass --output and/or --mongo")
+
+    progress = Progress(len(inputs), checkpoint.next_index, args.progress_interval)
+    pending_rows, pending_docs, pending_count = [], [], 0
+    in_flight = deque()
+    next_index = checkpoint.next_index
+
+    async def flush():
+        nonlocal pending_rows, pending_docs, pending_count
+        for sink in sinks:
+            await sink.write(pending_rows, pending_docs)
+        checkpoint.next_index += pending_count
+        checkpoint.save()
+        pending_rows, pending_docs, pending_count = [], [], 0
+
+    try:
+        while in_flight or next_index < len(inputs):
+            # Keep the pipeline full: later batches decode while earlier ones run the model
+            while next_index < len(inputs) and len(in_flight) < args.prefetch:
+                batch = inputs[next_index:next_index + args.batch_size]
+                in_flight.append(asyncio.create_task(score_batch(service, batch, args.batch_size)))
+                next_index += len(batch)
+
+            # Batches complete in order, so the checkpoint is always a clean prefix
+            scored = await in_flight.popleft()
+            rows, documents = to_outputs(service, class_names, scored)
+            pending_rows.extend(rows)
+            pending_docs.extend(documents)
+            pending_count += len(scored)
+            checkpoint.scored += len(documents)
+            checkpoint.failed += len(scored) - len(documents)
+            if pending_count >= args.flush_every:
+                await flush()
+            progress.update(checkpoint.next_index + pending_count)
+
+        if pending_count:
+            await flush()
+        progress.update(checkpoint.next_index, force=True)
+        print(f"Scored {checkpoint.scored} images, {checkpoint.failed} failed")
+    finally:
+        for task in in_flight:
+            task.cancel()
+        for sink in sinks:
+            await sink.close()
+        await service.close()
+        pool.shutdown()
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input-dir", help="directory of images, walked recursively")
+    source.add_argument("--manifest", help="file listing one image path per line")
+    parser.add_argument("--output", help="results file, .csv or .parquet")
+    parser.add_argument("--mongo", action="store_true", help="store predictions in MongoDB")
+    parser.add_argument("--checkpoint", help="checkpoint file for resuming")
+    parser.add_argument("--model-path", default=settings.MODEL_PATH)
+    parser.add_argument("--model-version", default=settings.MODEL_VERSION)
+    parser.add_argument("--classes-path", default=settings.CLASSES_PATH)
+    parser.add_argument("--backend", default=settings.INFERENCE_BACKEND)
+    parser.add_argument("--batch-size", type=int, default=64, help="images per forward pass")
+    parser.add_argument("--prefetch", type=int, default=4, help="batches read and decoded ahead")
+    parser.add_argument("--executor", choices=("thread", "process"), default=settings.INFERENCE_EXECUTOR,
+                        help="where images are decoded")
+    parser.add_argument("--decode-workers", type=int, default=settings.INFERENCE_WORKERS, help="0 = one per CPU")
+    parser.add_argument("--flush-every", type=int, default=1024, help="images per write and checkpoint")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress lines")
+    parser.add_argument("--limit", type=int, help="score only the first N images")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if settings.DEBUG else logging.INFO)
+    asyncio.run(run(args))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# backend/scripts/serve.py
+"""
+Serve the API as several uvicorn workers in front of one inference server.
+
+The inference server is the only process that loads TensorFlow and the
+model weights. HTTP workers decode and normalize uploads and hand the
+float32 batches to it through shared memory, so adding workers adds HTTP
+concurrency without another copy of the model in RAM. Both tiers read the
+usual settings (MODEL_PATH, INFERENCE_BACKEND, INFERENCE_THREADS, ...);
+this script points the workers at the server through INFERENCE_SERVER_ADDRESS
+and hands them INFERENCE_SERVER_AUTHKEY (a random one unless it is set), the
+secret every connection to the server must prove it knows.
+
+Each worker keeps its own model registry and routing, so with several
+workers the runtime /models/ endpoints are turned off
+(MODEL_MANAGEMENT_ENABLED=False): a deploy or routing change would reach
+one random worker only. Serve further versions through EXTRA_MODELS and
+MODEL_ROUTING_WEIGHTS and restart to change them.
+
+Run from backend/:
+    python -m scripts.serve --workers 4 --port 8000
+    INFERENCE_SERVER_AUTHKEY=... python -m scripts.serve --server-only --socket /run/brain_tumor/inference.sock
+"""
+import argparse
+import multiprocessing
+import os
+import secrets
+import sys
+import tempfile
+
+import uvicorn
+
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.services.inference_server import run_server
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="uvicorn worker processes")
+    parser.add_argument("--socket", help="Unix socket of the inference server (default: a temporary path)")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="load MODEL_PATH on the first request instead of before serving")
+    parser.add_argument("--server-only", action="store_true",
+                        help="run only the inference server, for HTTP workers started separately")
+    args = parser.parse_args()
+
+    address = args.socket or os.path.join(tempfile.gettempdir(), f"brain_tumor_inference_{os.getpid()}.sock")
+    preload = [] if args.no_preload else [(settings.MODEL_PATH, settings.INFERENCE_BACKEND)]
+    if args.server_only:
+        # Separately started workers must be given the same INFERENCE_SERVER_AUTHKEY
+        run_server(address, preload)
+        return 0
+
+    authkey = settings.INFERENCE_SERVER_AUTHKEY or secrets.token_hex(32)
+
+    # spawn, so the server does not inherit anything this process imported
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    server = context.Process(target=run_server, args=(address, preload, ready, authkey), name="inference-server")
+    server.start()
+    try:
+        while not ready.wait(1.0):
+            if not server.is_alive():
+                print("Inference server failed to start", file=sys.stderr)
+                return 1
+        # uvicorn workers read their settings from the environment
+        os.environ["INFERENCE_SERVER_ADDRESS"] = address
+        os.environ["INFERENCE_SERVER_AUTHKEY"] = authkey
+        if args.workers > 1:
+            os.environ["MODEL_MANAGEMENT_ENABLED"] = "False"
+        uvicorn.run("src.brain_tumor.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        server.terminate()
+        server.join()
+        if os.path.exists(address):
+            os.unlink(address)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,13 +8,129 @@ class Settings(BaseSettings):
     # MongoDB settings (with explicit default)
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     DATABASE_NAME: str = "brain_tumor_db"
-    
+
+    # MongoDB pool sizing (per server) and timeouts in ms (0 = driver default)
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "0"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "0"))
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+
+    # Wire compression such as "zstd,snappy,zlib" (zstd and snappy need their
+    # Python packages) and write concern: w ("1", "majority", ...), journal, wtimeout
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
+    MONGO_WRITE_CONCERN: str = os.getenv("MONGO_WRITE_CONCERN", "")
+    MONGO_WRITE_JOURNAL: bool = os.getenv("MONGO_WRITE_JOURNAL", "False").lower() == "true"
+    MONGO_WRITE_TIMEOUT_MS: int = int(os.getenv("MONGO_WRITE_TIMEOUT_MS", "0"))
+
+    # Create the collections' indexes at startup (idempotent)
+    MONGO_ENSURE_INDEXES: bool = os.getenv("MONGO_ENSURE_INDEXES", "True").lower() == "true"
+
     # Model settings (with path resolution)
     MODEL_PATH: str = os.getenv("MODEL_PATH", "src/brain_tumor/models/brain_tumor_model.h5")
 
+    # Inference runtime: "keras" (.h5/.keras), "tflite" (.tflite) or "onnx" (.onnx);
+    # MODEL_PATH must point at a file of the matching format
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "keras")
+    INFERENCE_THREADS: int = int(os.getenv("INFERENCE_THREADS", "0"))  # 0 = runtime default
+
+    # Unix socket of an inference server (scripts/serve.py) that runs the models for
+    # all workers on this host, and the shared secret connections authenticate with;
+    # empty address: each process loads its own models
+    INFERENCE_SERVER_ADDRESS: str = os.getenv("INFERENCE_SERVER_ADDRESS", "")
+    INFERENCE_SERVER_AUTHKEY: str = os.getenv("INFERENCE_SERVER_AUTHKEY", "")
+
+    # Stored with each prediction and used to scope cached results
+    MODEL_VERSION: str = os.getenv("MODEL_VERSION", "v1")
+
+    # Further versions served next to MODEL_VERSION, comma-separated
+    # "version=model_path[|classes_path[|backend]]", and routing weights such as
+    # "v2=10" (percent, MODEL_VERSION takes the rest) or "v1=3,v2=1" (relative, once
+    # MODEL_VERSION is weighted too); empty: everything goes to MODEL_VERSION
+    EXTRA_MODELS: str = os.getenv("EXTRA_MODELS", "")
+    MODEL_ROUTING_WEIGHTS: str = os.getenv("MODEL_ROUTING_WEIGHTS", "")
+
+    # POST/PUT/DELETE /models/ need this token in the X-Admin-Token header (empty: those
+    # endpoints are disabled); the model and class files they deploy must be in MODELS_DIR
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    MODELS_DIR: str = os.getenv("MODELS_DIR", "src/brain_tumor/models")
+
+    # The model registry is per process: scripts/serve.py turns runtime changes off when
+    # it starts several workers, which then serve EXTRA_MODELS/MODEL_ROUTING_WEIGHTS only
+    MODEL_MANAGEMENT_ENABLED: bool = os.getenv("MODEL_MANAGEMENT_ENABLED", "True").lower() == "true"
+
     #classes settings
     CLASSES_PATH: str =os.getenv("CLASSES_PATH", "src/brain_tumor/models/class_dict.npy")
     
+    # Load and warm up the model at startup instead of on the first request
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "True").lower() == "true"
+    WARMUP_BATCHES: int = int(os.getenv("WARMUP_BATCHES", "3"))
+    
+    # Inference batching settings
+    BATCHING_ENABLED: bool = os.getenv("BATCHING_ENABLED", "True").lower() == "true"
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "16"))
+    BATCH_MAX_WAIT_MS: float = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+    
+    # Inference worker pool settings ("thread" or "process" for decoding)
+    INFERENCE_EXECUTOR: str = os.getenv("INFERENCE_EXECUTOR", "thread")
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "0"))  # 0 = one per CPU
+    INFERENCE_MAX_PENDING: int = int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+    INFERENCE_RETRY_AFTER: int = int(os.getenv("INFERENCE_RETRY_AFTER", "1"))
+    
+    # Prediction result cache (in-process LRU/TTL plus optional Mongo lookup by image hash)
+    PREDICTION_CACHE_ENABLED: bool = os.getenv("PREDICTION_CACHE_ENABLED", "True").lower() == "true"
+    PREDICTION_CACHE_SIZE: int = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+    PREDICTION_CACHE_TTL: float = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+    PREDICTION_CACHE_MONGO: bool = os.getenv("PREDICTION_CACHE_MONGO", "True").lower() == "true"
+    
+    # Uploads are read in chunks and rejected as soon as they pass MAX_UPLOAD_BYTES
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+    UPLOAD_BUFFER_POOL_SIZE: int = int(os.getenv("UPLOAD_BUFFER_POOL_SIZE", "8"))
+    
+    # Whole request bodies, checked before multipart parsing spools them (0 = the file
+    # limit plus multipart framing: MAX_UPLOAD_BYTES, or BATCH_MAX_ARCHIVE_BYTES for
+    # /predict/batch/)
+    MAX_REQUEST_BYTES: int = int(os.getenv("MAX_REQUEST_BYTES", "0"))
+    BATCH_MAX_REQUEST_BYTES: int = int(os.getenv("BATCH_MAX_REQUEST_BYTES", "0"))
+    
+    # Grad-CAM heatmaps, computed only for requests that ask for them. EXPLAIN_LAYER
+    # names the layer to explain (empty: the last convolutional one); heatmaps are
+    # at most EXPLAIN_HEATMAP_SIZE pixels a side (0 = the layer's resolution)
+    EXPLAIN_LAYER: str = os.getenv("EXPLAIN_LAYER", "")
+    EXPLAIN_HEATMAP_SIZE: int = int(os.getenv("EXPLAIN_HEATMAP_SIZE", "32"))
+    EXPLAIN_CACHE_SIZE: int = int(os.getenv("EXPLAIN_CACHE_SIZE", "256"))  # 0 = no cache
+    
+    # Test-time augmentation and ensembles for borderline cases, for every /predict/
+    # request when enabled or per request (?tta=true, ?ensemble=true). TTA_VIEWS lists
+    # views of the image (original, hflip, vflip, crop_center, crop_tl, crop_tr, crop_bl,
+    # crop_br); crops keep TTA_CROP_FRACTION of each side. ENSEMBLE_VERSIONS names the
+    # loaded model versions to average (empty: all of them)
+    TTA_ENABLED: bool = os.getenv("TTA_ENABLED", "False").lower() == "true"
+    TTA_VIEWS: str = os.getenv("TTA_VIEWS", "original,hflip,crop_center,crop_tl,crop_br")
+    TTA_CROP_FRACTION: float = float(os.getenv("TTA_CROP_FRACTION", "0.9"))
+    ENSEMBLE_ENABLED: bool = os.getenv("ENSEMBLE_ENABLED", "False").lower() == "true"
+    ENSEMBLE_VERSIONS: str = os.getenv("ENSEMBLE_VERSIONS", "")
+    
+    # Batch (multi-slice study) upload limits
+    BATCH_MAX_FILES: int = int(os.getenv("BATCH_MAX_FILES", "256"))
+    BATCH_MAX_ARCHIVE_BYTES: int = int(os.getenv("BATCH_MAX_ARCHIVE_BYTES", str(512 * 1024 * 1024)))
+    
+    # Prediction history paging
+    HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "500"))
+    HISTORY_STREAM_BATCH_SIZE: int = int(os.getenv("HISTORY_STREAM_BATCH_SIZE", "500"))
+    
+    # Seconds /statistics/ reads are served from the in-process cache
+    STATS_CACHE_TTL: float = float(os.getenv("STATS_CACHE_TTL", "5"))
+    
+    # Write-behind persistence: respond before Mongo acknowledges, flush with insert_many
+    WRITE_BEHIND_ENABLED: bool = os.getenv("WRITE_BEHIND_ENABLED", "False").lower() == "true"
+    WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100"))
+    WRITE_BEHIND_FLUSH_MS: float = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "200"))
+    WRITE_BEHIND_MAX_PENDING: int = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+    
     # API settings
     API_PREFIX: str = "/api/v1"
     
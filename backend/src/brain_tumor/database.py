@@ -1,26 +1,214 @@
+import asyncio
+import logging
+import threading
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.monitoring import ConnectionPoolListener
+
 from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.services.metrics import REGISTRY
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# Initialize the MongoDB client at module level
-client = AsyncIOMotorClient(settings.MONGODB_URL)
+# One index per query path: history pages (optionally by class), the prediction
+# cache lookup, per-version queries and the statistics rollups
+PREDICTION_INDEXES = [
+    IndexModel([("prediction_date", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("prediction", ASCENDING), ("prediction_date", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("image_hash", ASCENDING), ("model_version", ASCENDING)]),
+    IndexModel([("model_version", ASCENDING), ("prediction_date", DESCENDING)]),
+]
+STATS_INDEXES = [
+    IndexModel([("granularity", ASCENDING), ("bucket", DESCENDING)]),
+]
 
-async def get_database():
+CHECKOUT_WAIT_SECONDS = REGISTRY.histogram(
+    "brain_tumor_mongo_checkout_wait_seconds",
+    "Time spent waiting for a connection from the MongoDB pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+CHECKOUT_FAILURES = REGISTRY.counter(
+    "brain_tumor_mongo_checkout_failures_total",
+    "Connection checkouts that failed, by reason",
+    labelnames=("reason",),
+)
+
+class PoolMonitor(ConnectionPoolListener):
     """
-    Get a handle to the database
+    Connection pool usage across all servers, from pymongo's pool events.
+    The driver keeps one pool per server, so ``capacity`` is the number of
+    pools times ``max_pool_size``.
     """
+    def __init__(self, max_pool_size):
+        self.max_pool_size = max_pool_size
+        self.pools = set()
+        self.open = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.cleared = 0
+        self._lock = threading.Lock()  # events arrive on the driver's threads
+
+    @property
+    def capacity(self):
+        return len(self.pools) * self.max_pool_size if self.max_pool_size else None
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools.add(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.cleared += 1
+        logger.warning("MongoDB connection pool for %s:%s was cleared", *event.address)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools.discard(event.address)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        if event.duration is not None:
+            CHECKOUT_WAIT_SECONDS.observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        CHECKOUT_FAILURES.inc(event.reason)
+        if event.duration is not None:
+            CHECKOUT_WAIT_SECONDS.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "servers": len(self.pools),
+                "max_pool_size": self.max_pool_size,
+                "capacity": self.capacity,
+                "open": self.open,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "cleared": self.cleared,
+            }
+
+    def register_metrics(self, registry=REGISTRY):
+        registry.gauge("brain_tumor_mongo_connections_open", "Open connections across all MongoDB pools",
+                       lambda: self.open)
+        registry.gauge("brain_tumor_mongo_connections_in_use", "Connections checked out of the MongoDB pools",
+                       lambda: self.in_use)
+        registry.gauge("brain_tumor_mongo_pool_capacity", "Connections the MongoDB pools may open in total",
+                       lambda: self.capacity)
+
+def client_options(settings):
+    """Keyword arguments for MongoClient from Settings; unset values keep the driver defaults."""
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+    }
+    timeouts = {
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "wTimeoutMS": settings.MONGO_WRITE_TIMEOUT_MS,
+    }
+    options.update((name, value) for name, value in timeouts.items() if value > 0)
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    if settings.MONGO_WRITE_CONCERN:
+        w = settings.MONGO_WRITE_CONCERN
+        options["w"] = int(w) if w.isdigit() else w
+    if settings.MONGO_WRITE_JOURNAL:
+        options["journal"] = True
+    return options
+
+def create_client(settings, event_listeners=None):
+    return AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=event_listeners or [],
+                              **client_options(settings))
+
+async def ensure_indexes(db):
+    """Create the indexes every query path relies on; existing ones are left alone."""
+    await db.predictions.create_indexes(PREDICTION_INDEXES)
+    await db.prediction_stats.create_indexes(STATS_INDEXES)
+
+# Set by connect_to_database() at startup and cleared again at shutdown
+client = None
+database = None
+index_task = None
+pool_monitor = PoolMonitor(settings.MONGO_MAX_POOL_SIZE)
+pool_monitor.register_metrics()
+
+async def bootstrap_indexes(db):
     try:
-        # Get the database from the client
-        db = client[settings.DATABASE_NAME]
-        return db
+        await ensure_indexes(db)
+        logger.info("MongoDB indexes are in place")
     except Exception as e:
-        print(f"Database connection error: {e}")
-        raise
+        logger.error("Creating MongoDB indexes failed: %s", e)
+
+async def connect_to_database():
+    """
+    Create the client (unless one was set already) and start bootstrapping the indexes
+    """
+    global client, database, index_task
+    if client is None:
+        client = create_client(settings, event_listeners=[pool_monitor])
+    database = client[settings.DATABASE_NAME]
+    if settings.MONGO_ENSURE_INDEXES:
+        # In the background: with Mongo unreachable this waits out server selection,
+        # which must not hold up startup or /health
+        index_task = asyncio.create_task(bootstrap_indexes(database))
+
+async def get_database():
+    """
+    Get a handle to the database
+    """
+    if database is None:
+        raise RuntimeError("The database is not connected; connect_to_database() runs at application startup")
+    return database
+
+# Coroutines run before the client closes, e.g. to flush buffered writes
+shutdown_hooks = []
+
+def register_shutdown_hook(hook):
+    shutdown_hooks.append(hook)
 
-def close_db_connection():
+async def close_db_connection():
     """
-    Close the database connection
+    Run shutdown hooks, then close the database connection
     """
+    global client, database, index_task
+    if index_task is not None:
+        index_task.cancel()
+        await asyncio.gather(index_task, return_exceptions=True)
+        index_task = None
+    for hook in shutdown_hooks:
+        try:
+            await hook()
+        except Exception as e:
+            logger.error("Database shutdown hook error: %s", e)
     if client:
-        client.close()
\ No newline at end of file
+        client.close()
+    client = None
+    database = None
@@ -1,14 +1,74 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .routes import prediction
 from .config.setting import get_settings
+from .database import close_db_connection, connect_to_database, get_database
+from .services.metrics import REGISTRY, REQUEST_SECONDS
+from .services.model_registry import parse_model_specs, parse_weights
+from .services.serialization import ORJSONResponse
+from .services.uploads import MULTIPART_OVERHEAD_BYTES, RequestSizeLimitMiddleware
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+warmup_state = {"task": None, "error": None}
+
+async def check_stats_totals():
+    # Only creates the totals; older predictions are counted by scripts/rebuild_stats.py
+    try:
+        await prediction.stats_service.ensure_totals(await get_database())
+    except Exception as e:
+        logger.error("Checking prediction statistics failed: %s", e)
+
+async def warm_up_model():
+    registry = prediction.model_registry
+    try:
+        if settings.WARMUP_ON_STARTUP:
+            await registry.default.warm_up()
+        for version, model_path, classes_path, backend in parse_model_specs(settings.EXTRA_MODELS):
+            await registry.deploy(version, model_path, classes_path, backend)
+        registry.set_routing(weights=parse_weights(settings.MODEL_ROUTING_WEIGHTS))
+    except Exception as e:
+        warmup_state["error"] = str(e)
+        logger.error("Model warm-up failed: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Configured here rather than at import, so importing the app has no side effects
+    logging.basicConfig(level=logging.DEBUG if settings.DEBUG else logging.INFO)
+    await connect_to_database()
+    stats_task = asyncio.create_task(check_stats_totals())
+    # Run in the background so /health can report progress while loading
+    if settings.WARMUP_ON_STARTUP or settings.EXTRA_MODELS or settings.MODEL_ROUTING_WEIGHTS:
+        warmup_state["task"] = asyncio.create_task(warm_up_model())
+    yield
+    if warmup_state["task"] is not None:
+        warmup_state["task"].cancel()
+    stats_task.cancel()
+    await prediction.model_registry.close()
+    await close_db_connection()
 
 app = FastAPI(
     title="TumorTech : Brain Tumor Detection API",
     description="API for detecting brain tumors from MRI scans",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# Reject oversize bodies while they stream in; added first so 413s still get CORS headers
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_bytes=settings.MAX_REQUEST_BYTES or settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    path_limits={
+        settings.API_PREFIX + "/predict/batch/":
+            settings.BATCH_MAX_REQUEST_BYTES or settings.BATCH_MAX_ARCHIVE_BYTES + MULTIPART_OVERHEAD_BYTES,
+    },
 )
 
 # Configure CORS
@@ -18,15 +78,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", prediction.MODEL_VERSION_HEADER],
 )
 
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep series bounded
+        route = request.scope.get("route")
+        if route is not None:
+            route = route.path
+            # Depending on the FastAPI version, included routes may not carry the router prefix
+            if request.url.path.startswith(settings.API_PREFIX) and not route.startswith(settings.API_PREFIX):
+                route = settings.API_PREFIX + route
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            request.method,
+            route or "unmatched",
+            str(status),
+        )
+
 # Include routes
-app.include_router(prediction.router, prefix="/api/v1", tags=["predictions"])
+app.include_router(prediction.router, prefix=settings.API_PREFIX, tags=["predictions"])
 
 @app.get("/")
 async def root():
     return {"message": "Brain Tumor Detection API", "status": "active"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    model_service = prediction.model_registry.default
+    if model_service.ready or not settings.WARMUP_ON_STARTUP:
+        return {"status": "healthy", "model_loaded": model_service.model is not None}
+    if warmup_state["error"]:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": warmup_state["error"]})
+    return JSONResponse(status_code=503, content={"status": "starting"})
\ No newline at end of file
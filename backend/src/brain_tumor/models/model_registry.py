@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional, Dict
+
+class ModelDeployRequest(BaseModel):
+    version: str
+    model_path: str
+    classes_path: Optional[str] = None
+    backend: Optional[str] = None
+    weight: Optional[float] = None
+    make_default: bool = False
+
+class RoutingUpdate(BaseModel):
+    weights: Optional[Dict[str, float]] = None
+    default_version: Optional[str] = None
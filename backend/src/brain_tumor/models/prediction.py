@@ -1,8 +1,14 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Annotated, Optional, Dict, Any, List
+
+# Mongo ObjectIds are exposed as their hex string
+ObjectIdStr = Annotated[str, BeforeValidator(str)]
 
 class PredictionBase(BaseModel):
+    # Fields such as model_version are ours, not Pydantic's model_* API
+    model_config = ConfigDict(protected_namespaces=())
+
     image_name: str
     prediction: str
     confidence: float
@@ -11,35 +17,78 @@ class PredictionBase(BaseModel):
 class PredictionCreate(PredictionBase):
     prediction_date: datetime = Field(default_factory=datetime.utcnow)
     full_result: Optional[Dict[str, Any]] = None
+    image_hash: Optional[str] = None
+    model_version: Optional[str] = None
+    study_id: Optional[str] = None
 
 class PredictionResponse(PredictionBase):
-    id: Optional[str] = Field(None, alias="_id")
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True, protected_namespaces=())
+
+    id: Optional[ObjectIdStr] = Field(None, alias="_id")
     prediction_date: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
-        allow_population_by_field_name = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+class Heatmap(BaseModel):
+    """Grad-CAM heatmap: a low-resolution 8-bit grayscale PNG, base64-encoded."""
+    format: str
+    width: int
+    height: int
+    data: str
+
+class EnsembleSummary(BaseModel):
+    """How the passes of a test-time augmented or ensemble prediction agreed."""
+    model_config = ConfigDict(protected_namespaces=())
+
+    views: List[str]
+    model_versions: List[str]
+    passes: int
+    agreement: float
+    mutual_information: float
+    confidence_std: float
+
+class PredictionResult(BaseModel):
+    """
+    Response of POST /predict/; ``heatmap`` only with ``explain=true``,
+    ``uncertainty`` and ``ensemble`` only with ``tta=true`` or ``ensemble=true``.
+    """
+    model_config = ConfigDict(populate_by_name=True, protected_namespaces=())
 
-class DetailedPredictionResponse(BaseModel):
-    _id: str
-    image_name: str
     prediction: str
     confidence: float
-    prediction_date: datetime
     model_accuracy: float
     diagnosis: str
     tumor_type: str
     tumor_info: str
     class_probabilities: Dict[str, float]
+    id: Optional[ObjectIdStr] = Field(None, alias="_id")
+    heatmap: Optional[Heatmap] = None
+    uncertainty: Optional[float] = None
+    ensemble: Optional[EnsembleSummary] = None
+
+class DetailedPredictionResponse(BaseModel):
+    """One item of the prediction history; result fields are absent for bare documents."""
+    model_config = ConfigDict(populate_by_name=True, protected_namespaces=())
+
+    id: ObjectIdStr = Field(alias="_id")
+    image_name: Optional[str] = None
+    prediction: Optional[str] = None
+    confidence: Optional[float] = None
+    prediction_date: Optional[datetime] = None
+    model_version: Optional[str] = None
+    model_accuracy: Optional[float] = None
+    diagnosis: Optional[str] = None
+    tumor_type: Optional[str] = None
+    tumor_info: Optional[str] = None
+    class_probabilities: Optional[Dict[str, float]] = None
 
 class ReportResponse(BaseModel):
     report: str
 
+class TumorTypeStatistics(BaseModel):
+    count: int
+    percentage: float
+
 class StatisticsResponse(BaseModel):
     total_predictions: int
-    tumor_types: Dict[str, Dict[str, Any]]
+    tumor_types: Dict[str, TumorTypeStatistics]
     has_tumor: int
-    no_tumor: int
\ No newline at end of file
+    no_tumor: int
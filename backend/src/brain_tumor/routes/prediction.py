@@ -1,100 +1,441 @@
+import asyncio
+import hmac
 import logging
 import traceback
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
-import json
-from bson import ObjectId
-from src.brain_tumor.models.prediction import PredictionCreate, PredictionResponse, DetailedPredictionResponse
+import uuid
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Dict, Any, Optional
+from src.brain_tumor.models.model_registry import ModelDeployRequest, RoutingUpdate
+from src.brain_tumor.models.prediction import (
+    DetailedPredictionResponse, PredictionCreate, PredictionResult, ReportResponse, StatisticsResponse
+)
+from src.brain_tumor.services.explanations import ExplanationUnavailableError
+from src.brain_tumor.services.metrics import REGISTRY, STAGE_SECONDS
+from src.brain_tumor.services.model_registry import ModelRegistry, UnknownModelVersionError
 from src.brain_tumor.services.model_service import ModelService
-from src.brain_tumor.database import get_database
+from src.brain_tumor.services.prediction_cache import PredictionCache
+from src.brain_tumor.services.preprocessing import InvalidImageError, MemoryReader, parse_tta_views
+from src.brain_tumor.services.prediction_history import (
+    HISTORY_PROJECTION, HISTORY_SORT, InvalidCursorError,
+    build_history_query, encode_cursor, format_prediction
+)
+from src.brain_tumor.services.serialization import ORJSONResponse, dumps
+from src.brain_tumor.services.stats_service import StatsService
+from src.brain_tumor.services.uploads import (
+    UploadBufferPool, UploadRejectedError, read_upload, sniff_archive_format, sniff_image_format
+)
+from src.brain_tumor.services.worker_pool import ServiceOverloadedError, WorkerPool
+from src.brain_tumor.services.write_behind import WriteBehindQueue
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.database import get_database, pool_monitor, register_shutdown_hook
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Logging is configured when the application starts
 logger = logging.getLogger(__name__)
 
-# Custom JSONEncoder to handle ObjectId
-class JSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, ObjectId):
-            return str(o)
-        return json.JSONEncoder.default(self, o)
+settings = get_settings()
 
 router = APIRouter()
-model_service = ModelService()
 
-@router.post("/predict/")
+prediction_cache = None
+if settings.PREDICTION_CACHE_ENABLED:
+    prediction_cache = PredictionCache(
+        model_version=settings.MODEL_VERSION,
+        max_entries=settings.PREDICTION_CACHE_SIZE,
+        ttl_seconds=settings.PREDICTION_CACHE_TTL,
+        use_mongo=settings.PREDICTION_CACHE_MONGO,
+    )
+
+# Grad-CAM heatmaps by image hash; memory only, they are not stored with predictions
+heatmap_cache = None
+if settings.EXPLAIN_CACHE_SIZE > 0:
+    heatmap_cache = PredictionCache(
+        model_version=settings.MODEL_VERSION,
+        max_entries=settings.EXPLAIN_CACHE_SIZE,
+        ttl_seconds=settings.PREDICTION_CACHE_TTL,
+        use_mongo=False,
+    )
+
+def forget_cached_results(model_version):
+    # Results cached for a replaced model must not outlive it
+    for cache in (prediction_cache, heatmap_cache):
+        if cache is not None:
+            cache.clear(model_version)
+
+# Every loaded model version shares one pool, so admission control covers them all
+model_registry = ModelRegistry(
+    default_version=settings.MODEL_VERSION,
+    pool=WorkerPool(
+        kind=settings.INFERENCE_EXECUTOR,
+        workers=settings.INFERENCE_WORKERS,
+        max_pending=settings.INFERENCE_MAX_PENDING,
+        retry_after=settings.INFERENCE_RETRY_AFTER,
+    ),
+    on_replace=forget_cached_results,
+)
+model_registry.add(model_registry.create_service(
+    settings.MODEL_VERSION, settings.MODEL_PATH, settings.CLASSES_PATH, settings.INFERENCE_BACKEND
+))
+model_registry.register_metrics()
+
+MODEL_VERSION_HEADER = "X-Model-Version"
+
+def select_model(response: Response, x_model_version: Optional[str] = Header(None)) -> ModelService:
+    """
+    Dependency routing a request to a model version: the one named in the
+    X-Model-Version header, else by routing weights. The version used is
+    echoed in the same response header.
+    """
+    try:
+        model_service = model_registry.route(x_model_version)
+    except UnknownModelVersionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    response.headers[MODEL_VERSION_HEADER] = model_service.model_version
+    return model_service
+
+def tta_options(
+    tta: Optional[bool] = None,
+    tta_views: Optional[str] = None,
+    ensemble: Optional[bool] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Dependency resolving a request's test-time augmentation and ensemble
+    options, by default from the TTA_* and ENSEMBLE_* settings; naming
+    ``tta_views`` turns TTA on. None for a plain prediction, else the views
+    and the further model versions to run.
+    """
+    if tta is None:
+        tta = settings.TTA_ENABLED or tta_views is not None
+    if ensemble is None:
+        ensemble = settings.ENSEMBLE_ENABLED
+    if not (tta or ensemble):
+        return None
+    try:
+        views = parse_tta_views(tta_views or settings.TTA_VIEWS) if tta else ["original"]
+        members = []
+        if ensemble:
+            versions = [v.strip() for v in settings.ENSEMBLE_VERSIONS.split(",") if v.strip()]
+            members = [model_registry.get(version) for version in versions or model_registry.versions]
+    except UnknownModelVersionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"views": views, "members": members}
+
+stats_service = StatsService(ttl_seconds=settings.STATS_CACHE_TTL)
+
+async def record_stats(db, documents):
+    # The predictions are stored by now; failing the request would only invite a duplicate retry
+    try:
+        await stats_service.record(db, [(d["prediction"], d["prediction_date"]) for d in documents])
+    except Exception as e:
+        logger.error("Recording prediction statistics failed: %s", e)
+
+write_behind = None
+if settings.WRITE_BEHIND_ENABLED:
+    write_behind = WriteBehindQueue(
+        get_database,
+        max_batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_ms=settings.WRITE_BEHIND_FLUSH_MS,
+        max_pending=settings.WRITE_BEHIND_MAX_PENDING,
+        on_flush=record_stats,
+    )
+    register_shutdown_hook(write_behind.close)
+    REGISTRY.gauge("brain_tumor_write_behind_pending", "Prediction documents waiting to be written",
+                   lambda: write_behind.pending)
+
+async def store_predictions(db, documents) -> List[str]:
+    """Persist prediction documents, directly or through the write-behind queue."""
+    with STAGE_SECONDS.time("db_insert"):
+        if write_behind is not None:
+            ids = await write_behind.put_many(documents)
+        elif len(documents) == 1:
+            result = await db.predictions.insert_one(documents[0])
+            ids = [result.inserted_id]
+            await record_stats(db, documents)
+        else:
+            result = await db.predictions.insert_many(documents)
+            ids = result.inserted_ids
+            await record_stats(db, documents)
+    return [str(inserted_id) for inserted_id in ids]
+
+upload_buffers = UploadBufferPool(max_buffers=settings.UPLOAD_BUFFER_POOL_SIZE)
+REGISTRY.gauge("brain_tumor_upload_buffers_reused", "Uploads read into a pooled buffer",
+               lambda: upload_buffers.reused)
+
+async def read_image_upload(file: UploadFile, buffer=None, max_bytes=None, sniff=sniff_image_format) -> memoryview:
+    """Read an upload in bounded chunks, turning rejections into 4xx responses."""
+    try:
+        with STAGE_SECONDS.time("upload_read"):
+            return await read_upload(
+                file,
+                max_bytes or settings.MAX_UPLOAD_BYTES,
+                chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                buffer=buffer,
+                sniff=sniff
+            )
+    except UploadRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+async def image_upload(file: UploadFile = File(...)) -> AsyncIterator[memoryview]:
+    """Dependency yielding the uploaded image as a view into a pooled buffer."""
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    buffer = upload_buffers.acquire()
+    contents = None
+    try:
+        contents = await read_image_upload(file, buffer)
+        yield contents
+    finally:
+        if contents is not None:
+            contents.release()
+        upload_buffers.release(buffer)
+
+def overloaded_response(e: ServiceOverloadedError) -> HTTPException:
+    """Build the 503 returned when the inference pool is saturated."""
+    logger.warning("Inference pool saturated, rejecting request")
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+@router.post("/predict/", response_model=PredictionResult, response_model_exclude_none=True)
 async def create_prediction(
     file: UploadFile = File(...),
+    explain: bool = False,
+    contents: memoryview = Depends(image_upload),
+    model_service: ModelService = Depends(select_model),
+    augmentation: Optional[Dict[str, Any]] = Depends(tta_options),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Create a new prediction from an uploaded MRI image and return formatted report directly.
-    """
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
     
+    ``explain=true`` adds a Grad-CAM ``heatmap`` of where the model looked,
+    computed in the same forward pass as the prediction. ``tta=true`` (views
+    from ``tta_views`` or TTA_VIEWS) and ``ensemble=true`` average several
+    views and model versions in batched passes and add an ``uncertainty`` score.
+    """
     try:
-        logger.debug(f"Reading file: {file.filename}")
-        contents = await file.read()
+        image_hash = PredictionCache.hash_bytes(contents)
         
-        logger.debug("Making prediction with model")
-        prediction_result = await model_service.predict_image(contents)
-        logger.debug(f"Prediction result: {prediction_result}")
+        # Repeat uploads of the same image return the stored prediction
+        cached = None
+        if prediction_cache is not None and augmentation is None:
+            cached = await prediction_cache.get(image_hash, db, model_version=model_service.model_version)
         
-        # Store prediction in database
-        prediction = PredictionCreate(
-            image_name=file.filename,
-            prediction=prediction_result["prediction"],
-            confidence=prediction_result["confidence"],
-            full_result=prediction_result
-        )
-        
-        result = await db.predictions.insert_one(prediction.dict())
-        prediction_id = str(result.inserted_id)
+        heatmap = explained_result = None
+        if explain:
+            cached_heatmap = None
+            if heatmap_cache is not None:
+                cached_heatmap = await heatmap_cache.get(image_hash, model_version=model_service.model_version)
+            if cached_heatmap is not None:
+                heatmap = cached_heatmap["result"]
+            else:
+                explained_result, heatmap = await model_service.explain_image(contents)
+                if heatmap_cache is not None:
+                    heatmap_cache.put(image_hash, heatmap, model_version=model_service.model_version)
         
-        # Format the response in the exact format requested
-        class_probabilities = prediction_result["class_probabilities"]
+        if cached is not None:
+            logger.debug("Using cached prediction")
+            prediction_result = cached["result"]
+            prediction_id = cached["_id"]
+        elif augmentation is not None:
+            logger.debug("Making test-time augmented prediction")
+            # A Grad-CAM pass above already scored the unaugmented view
+            prediction_result = await model_service.predict_image_tta(
+                contents, augmentation["views"], settings.TTA_CROP_FRACTION, augmentation["members"],
+                explained=explained_result
+            )
+            prediction_id = None
+        elif explained_result is not None:
+            # The Grad-CAM pass already produced the prediction
+            prediction_result = explained_result
+            prediction_id = None
+        else:
+            logger.debug("Making prediction with model")
+            prediction_result = await model_service.predict_image(contents)
+            logger.debug("Prediction result: %s", prediction_result)
+            prediction_id = None
         
-        # Direct response body with the exact format
-        response = {
-            "prediction": prediction_result["prediction"],
-            "confidence": prediction_result["confidence"],
-            "model_accuracy": prediction_result["model_accuracy"],
-            "diagnosis": prediction_result["diagnosis"],
-            "tumor_type": prediction_result["tumor_type"],
-            "tumor_info": prediction_result["tumor_info"],
-            "class_probabilities": class_probabilities,
-            "_id": prediction_id
-        }
+        # Entries cached by the report endpoint have no stored document yet
+        if prediction_id is None:
+            # Store prediction in database
+            prediction = PredictionCreate(
+                image_name=file.filename,
+                prediction=prediction_result["prediction"],
+                confidence=prediction_result["confidence"],
+                full_result=prediction_result,
+                image_hash=image_hash,
+                model_version=model_service.model_version
+            )
+            
+            prediction_id = (await store_predictions(db, [prediction.model_dump()]))[0]
+            if prediction_cache is not None and augmentation is None:
+                prediction_cache.put(image_hash, prediction_result, prediction_id, model_service.model_version)
         
+        # PredictionResult picks the response fields; no copy field by field
         logger.debug("Returning prediction response")
-        return response
+        return {**prediction_result, "_id": prediction_id, "heatmap": heatmap}
         
+    except (ExplanationUnavailableError, InvalidImageError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ServiceOverloadedError as e:
+        raise overloaded_response(e)
     except RuntimeError as e:
-        logger.error(f"Model prediction error: {str(e)}")
+        logger.error("Model prediction error: %s", e)
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Model prediction error: {str(e)}")
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+def is_zip_upload(file: UploadFile) -> bool:
+    return file.content_type in ZIP_CONTENT_TYPES or (file.filename or "").lower().endswith(".zip")
+
+def too_many_slices() -> UploadRejectedError:
+    return UploadRejectedError(413, f"At most {settings.BATCH_MAX_FILES} images per batch")
+
+def extract_archive_images(contents: memoryview, max_bytes: int, max_files: int) -> List[tuple]:
+    """Return (name, bytes) for every image in a zip archive, in name order."""
+    with zipfile.ZipFile(MemoryReader(contents)) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        # Check the member count and declared sizes before decompressing anything
+        if len(members) > max_files:
+            raise too_many_slices()
+        if sum(info.file_size for info in members) > max_bytes:
+            raise ValueError(f"Archive expands beyond {max_bytes} bytes")
+        members.sort(key=lambda info: info.filename)
+        return [(info.filename, archive.read(info)) for info in members]
+
+@router.post("/predict/batch/")
+async def create_batch_prediction(
+    files: List[UploadFile] = File(...),
+    model_service: ModelService = Depends(select_model),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Predict every slice of an MRI study with batched inference.
+    Accepts several image files and/or zip archives of images, and returns
+    per-slice results plus a study-level aggregate.
+    """
+    slices = []
+    for file in files:
+        if is_zip_upload(file):
+            contents = await read_image_upload(
+                file, max_bytes=settings.BATCH_MAX_ARCHIVE_BYTES, sniff=sniff_archive_format
+            )
+            try:
+                slices.extend(await asyncio.to_thread(
+                    extract_archive_images, contents, settings.BATCH_MAX_ARCHIVE_BYTES,
+                    settings.BATCH_MAX_FILES - len(slices)
+                ))
+            except UploadRejectedError as e:
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+            except (zipfile.BadZipFile, ValueError) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid archive {file.filename}: {str(e)}")
+        elif file.content_type and file.content_type.startswith("image/"):
+            if len(slices) >= settings.BATCH_MAX_FILES:
+                raise HTTPException(status_code=413, detail=too_many_slices().detail)
+            slices.append((file.filename, await read_image_upload(file)))
+        else:
+            raise HTTPException(status_code=400, detail=f"File {file.filename} must be an image or zip archive")
+    
+    if not slices:
+        raise HTTPException(status_code=400, detail="No images found in upload")
+    
+    try:
+        logger.debug("Running batch prediction on %s slices", len(slices))
+        results = await model_service.predict_images(
+            [contents for _, contents in slices], chunk_size=settings.BATCH_MAX_SIZE
+        )
+        
+        study_id = uuid.uuid4().hex
+        items = []
+        documents = []
+        hashes = []
+        for (name, contents), result in zip(slices, results):
+            if isinstance(result, BaseException):
+                items.append({"image_name": name, "error": f"Error processing image: {str(result)}"})
+                continue
+            image_hash = PredictionCache.hash_bytes(contents)
+            prediction = PredictionCreate(
+                image_name=name,
+                prediction=result["prediction"],
+                confidence=result["confidence"],
+                full_result=result,
+                image_hash=image_hash,
+                model_version=model_service.model_version,
+                study_id=study_id
+            )
+            documents.append(prediction.model_dump())
+            hashes.append(image_hash)
+            items.append({"image_name": name, **result})
+        
+        # One round trip for the whole study
+        if documents:
+            ids = iter(await store_predictions(db, documents))
+            for item in items:
+                if "error" not in item:
+                    item["_id"] = next(ids)
+            if prediction_cache is not None:
+                for image_hash, item, document in zip(hashes, (i for i in items if "error" not in i), documents):
+                    prediction_cache.put(image_hash, document["full_result"], item["_id"], model_service.model_version)
+        
+        # Up to BATCH_MAX_FILES slices: render directly rather than via jsonable_encoder
+        return ORJSONResponse(
+            {
+                "study_id": study_id,
+                "study": model_service.summarize_study([item for item in items if "error" not in item]),
+                "slices": items
+            },
+            headers={MODEL_VERSION_HEADER: model_service.model_version}
+        )
+    except ServiceOverloadedError as e:
+        raise overloaded_response(e)
+    except RuntimeError as e:
+        logger.error("Model prediction error: %s", e)
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Model prediction error: {str(e)}")
+    except Exception as e:
+        logger.error("Unexpected error: %s", e)
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 # Plain text report endpoint
-@router.post("/predict/report/", response_model=str)
+@router.post("/predict/report/", response_model=ReportResponse)
 async def get_prediction_report(
-    file: UploadFile = File(...),
+    contents: memoryview = Depends(image_upload),
+    model_service: ModelService = Depends(select_model),
 ):
     """
     Create a prediction and return just the formatted text report.
     """
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
-    
     try:
-        contents = await file.read()
-        prediction_result = await model_service.predict_image(contents)
+        image_hash = PredictionCache.hash_bytes(contents)
+        cached = None
+        if prediction_cache is not None:
+            cached = await prediction_cache.get(image_hash, model_version=model_service.model_version)
+        if cached is not None:
+            prediction_result = cached["result"]
+        else:
+            prediction_result = await model_service.predict_image(contents)
+            if prediction_cache is not None:
+                prediction_cache.put(image_hash, prediction_result, model_version=model_service.model_version)
         
         # Format as plain text report
         report = "===== Tumor Detection Report =====\n"
@@ -111,92 +452,226 @@ async def get_prediction_report(
         for class_name, prob in prediction_result['class_probabilities'].items():
             report += f"{class_name}: {prob:.2f}\n"
         
-        return JSONResponse(content={"report": report})
+        return {"report": report}
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ServiceOverloadedError as e:
+        raise overloaded_response(e)
     except Exception as e:
-        logger.error(f"Error generating report: {str(e)}")
+        logger.error("Error generating report: %s", e)
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error generating report: {str(e)}")
 
-@router.get("/predictions/")
+@router.get(
+    "/predictions/",
+    response_model=List[DetailedPredictionResponse],
+    response_model_exclude_unset=True
+)
 async def get_predictions(
-    limit: int = 10,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    prediction: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Get the most recent predictions with detailed results.
+    
+    Pages are keyset-paginated: pass the X-Next-Cursor header of one page as
+    ``cursor`` to get the next. ``format=ndjson`` streams every matching
+    prediction (or up to ``limit``) one JSON object per line for exports.
     """
     try:
-        cursor = db.predictions.find().sort("prediction_date", -1).limit(limit)
-        mongo_predictions = await cursor.to_list(length=limit)
+        query = build_history_query(prediction, start_date, end_date, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if format == "ndjson":
+        mongo_cursor = db.predictions.find(query, HISTORY_PROJECTION).sort(HISTORY_SORT)
+        mongo_cursor = mongo_cursor.batch_size(settings.HISTORY_STREAM_BATCH_SIZE)
+        if limit:
+            mongo_cursor = mongo_cursor.limit(limit)
+        return StreamingResponse(stream_predictions(mongo_cursor), media_type="application/x-ndjson")
+    
+    try:
+        page_size = min(limit or 10, settings.HISTORY_MAX_PAGE_SIZE)
+        # One extra document tells us whether another page exists
+        mongo_cursor = db.predictions.find(query, HISTORY_PROJECTION).sort(HISTORY_SORT).limit(page_size + 1)
+        docs = await mongo_cursor.to_list(length=page_size + 1)
         
-        # Format predictions for response
-        predictions = []
-        for doc in mongo_predictions:
-            # Make a copy of the document to avoid modifying the original
-            doc_copy = dict(doc)
-            
-            # Convert ObjectId to string
-            if "_id" in doc_copy:
-                doc_copy["_id"] = str(doc_copy["_id"])
-            
-            # Extract and format full_result at top level if available
-            if "full_result" in doc_copy:
-                result = doc_copy.pop("full_result")
-                # Merge the prediction details into the top level
-                doc_copy.update({
-                    "prediction": result["prediction"],
-                    "confidence": result["confidence"],
-                    "model_accuracy": result["model_accuracy"],
-                    "diagnosis": result["diagnosis"],
-                    "tumor_type": result["tumor_type"],
-                    "tumor_info": result["tumor_info"],
-                    "class_probabilities": result["class_probabilities"]
-                })
-            
-            predictions.append(doc_copy)
-            
-        return predictions
+        if len(docs) > page_size:
+            docs = docs[:page_size]
+            response.headers["X-Next-Cursor"] = encode_cursor(docs[-1])
+        
+        return [format_prediction(doc, model_registry.default.get_tumor_info) for doc in docs]
     except Exception as e:
-        logger.error(f"Error retrieving predictions: {str(e)}")
+        logger.error("Error retrieving predictions: %s", e)
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error retrieving predictions: {str(e)}")
 
-@router.get("/statistics/")
+async def stream_predictions(mongo_cursor):
+    try:
+        async for doc in mongo_cursor:
+            yield dumps(format_prediction(doc, model_registry.default.get_tumor_info)) + b"\n"
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated stream
+        logger.error("Error streaming predictions: %s", e)
+        logger.error(traceback.format_exc())
+        raise
+
+@router.get("/batching/stats/")
+async def get_batching_stats(model_version: Optional[str] = None):
+    """
+    Get batch-size and queue-wait metrics of the inference batching scheduler
+    of one model version (default: the default version).
+    """
+    try:
+        return model_registry.get(model_version).batching_stats()
+    except UnknownModelVersionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/workers/stats/")
+async def get_worker_stats():
+    """
+    Get admission and worker counters of the inference pool.
+    """
+    return model_registry.pool.stats()
+
+@router.get("/database/stats/")
+async def get_database_stats():
+    """
+    Get MongoDB connection pool usage, for sizing MONGO_MAX_POOL_SIZE.
+    """
+    return pool_monitor.stats()
+
+@router.get("/models/")
+async def get_models():
+    """
+    Get the loaded model versions, routing weights and deployments in progress.
+    """
+    return model_registry.stats()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding model management: X-Admin-Token must match ADMIN_TOKEN."""
+    if not settings.MODEL_MANAGEMENT_ENABLED:
+        raise HTTPException(
+            status_code=403,
+            detail="Model management is disabled while several workers serve the API; "
+                   "change EXTRA_MODELS or MODEL_ROUTING_WEIGHTS and restart instead"
+        )
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model management is disabled; set ADMIN_TOKEN to enable it")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing admin token")
+
+def check_model_file(path: Optional[str]):
+    """Reject model and class files outside MODELS_DIR."""
+    if path is not None and not Path(path).resolve().is_relative_to(Path(settings.MODELS_DIR).resolve()):
+        raise HTTPException(status_code=400, detail=f"Model files must be inside {settings.MODELS_DIR}")
+
+@router.post("/models/", status_code=202, dependencies=[Depends(require_admin)])
+async def deploy_model(request: ModelDeployRequest):
+    """
+    Load a model version in the background and swap it in once it is warmed up.
+    Redeploying a loaded version replaces it without downtime; a retrained
+    model should get a new version, since stored predictions are reused per
+    version. Poll GET /models/ for progress.
+    """
+    check_model_file(request.model_path)
+    check_model_file(request.classes_path)
+    if model_registry.is_deploying(request.version):
+        raise HTTPException(status_code=409, detail=f"Model version '{request.version}' is already loading")
+    try:
+        model_registry.deploy_in_background(
+            request.version,
+            request.model_path,
+            request.classes_path,
+            request.backend,
+            weight=request.weight,
+            make_default=request.make_default,
+        )
+    except UnknownModelVersionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"version": request.version, "status": "loading"}
+
+@router.put("/models/routing/", dependencies=[Depends(require_admin)])
+async def update_model_routing(update: RoutingUpdate):
+    """
+    Replace the routing weights between loaded versions and/or the default version.
+    """
+    try:
+        model_registry.set_routing(weights=update.weights, default_version=update.default_version)
+    except UnknownModelVersionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return model_registry.stats()
+
+@router.delete("/models/{version}", dependencies=[Depends(require_admin)])
+async def retire_model(version: str):
+    """
+    Unload a model version other than the default.
+    """
+    try:
+        await model_registry.retire(version)
+    except UnknownModelVersionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return model_registry.stats()
+
+@router.get("/write-behind/stats/")
+async def get_write_behind_stats():
+    """
+    Get queue depth and flush counters of write-behind persistence.
+    """
+    if write_behind is None:
+        return {"enabled": False}
+    return {"enabled": True, **write_behind.stats()}
+
+@router.get("/cache/stats/")
+async def get_cache_stats():
+    """
+    Get hit/miss counters of the prediction result and heatmap caches.
+    """
+    stats = {"enabled": False}
+    if prediction_cache is not None:
+        stats = {"enabled": True, **prediction_cache.stats()}
+    if heatmap_cache is not None:
+        stats["heatmaps"] = heatmap_cache.stats()
+    return stats
+
+@router.get("/statistics/", response_model=StatisticsResponse)
 async def get_stats(db: AsyncIOMotorDatabase = Depends(get_database)):
     """
     Get statistics about predictions by tumor type.
     """
     try:
-        total = await db.predictions.count_documents({})
-        
-        # Count by tumor type
-        pipeline = [
-            {"$group": {"_id": "$prediction", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        
-        counts_cursor = db.predictions.aggregate(pipeline)
-        counts = await counts_cursor.to_list(length=100)
-        
-        # Calculate percentages
-        type_stats = {}
-        for item in counts:
-            tumor_type = item["_id"]
-            count = item["count"]
-            percentage = count / total * 100 if total > 0 else 0
-            type_stats[tumor_type] = {
-                "count": count,
-                "percentage": round(percentage, 2)
-            }
-        
-        return {
-            "total_predictions": total,
-            "tumor_types": type_stats,
-            "has_tumor": sum(stats["count"] for tumor_type, stats in type_stats.items() 
-                           if tumor_type != "notumor"),
-            "no_tumor": type_stats.get("notumor", {}).get("count", 0)
-        }
+        return await stats_service.get_statistics(db)
+    except Exception as e:
+        logger.error("Statistics error: %s", e)
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Statistics error: {str(e)}")
+
+@router.get("/statistics/rollups/")
+async def get_stats_rollups(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get prediction counts per class in hourly or daily buckets, newest first.
+    """
+    try:
+        return await stats_service.get_rollups(db, granularity, start_date, end_date, limit)
     except Exception as e:
-        logger.error(f"Statistics error: {str(e)}")
+        logger.error("Statistics error: %s", e)
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Statistics error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Statistics error: {str(e)}")
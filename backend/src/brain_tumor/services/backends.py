@@ -0,0 +1,173 @@
+import logging
+import threading
+
+import numpy as np
+
+from src.brain_tumor.services.explanations import ExplanationUnavailableError, GradCam
+
+logger = logging.getLogger(__name__)
+
+class InferenceBackend:
+    """
+    Runs a classification model on normalized (N, H, W, 3) float32 batches.
+
+    Backends import their runtime inside ``load`` so that only the selected
+    one is ever pulled into the process.
+    """
+    name = "base"
+    supports_explanations = False
+
+    def __init__(self, model_path, num_threads=0, explain_layer=None):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.explain_layer = explain_layer
+
+    def load(self):
+        raise NotImplementedError
+
+    def predict(self, img_batch):
+        """Return an (N, num_classes) float32 array of class probabilities."""
+        raise NotImplementedError
+
+    def explain(self, img_batch):
+        """
+        Return (N, num_classes) probabilities and (N, h, w) Grad-CAM heatmaps
+        in [0, 1], computed from one forward pass.
+        """
+        raise ExplanationUnavailableError(f"The {self.name} backend cannot compute heatmaps")
+
+    def summary(self, print_fn=print):
+        print_fn(f"{self.name} backend: {self.model_path}")
+
+    def close(self):
+        """Release what ``load`` acquired beyond memory, if anything."""
+
+class KerasBackend(InferenceBackend):
+    """
+    Full TensorFlow/Keras model loaded from .h5 or .keras.
+
+    Batches go through a compiled ``model(x, training=False)`` call rather
+    than ``Model.predict``, whose per-call setup costs far more than the
+    forward pass itself at micro-batch sizes.
+    """
+    name = "keras"
+    supports_explanations = True
+
+    def load(self):
+        import tensorflow as tf
+        if self.num_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(self.num_threads)
+        self.model = tf.keras.models.load_model(self.model_path)
+        model = self.model
+        # reduce_retracing keeps one trace for all batch sizes
+        self._forward = tf.function(lambda x: model(x, training=False), reduce_retracing=True)
+        self._grad_cam = None  # built on the first explain() call
+        self._grad_cam_lock = threading.Lock()
+
+    def predict(self, img_batch):
+        return self._forward(img_batch).numpy()
+
+    def explain(self, img_batch):
+        if self._grad_cam is None:
+            with self._grad_cam_lock:
+                if self._grad_cam is None:
+                    self._grad_cam = GradCam(self.model, self.explain_layer)
+        return self._grad_cam(img_batch)
+
+    def summary(self, print_fn=print):
+        self.model.summary(print_fn=print_fn)
+
+def _load_tflite_interpreter():
+    """Prefer the standalone LiteRT/tflite runtimes over full TensorFlow."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+class TFLiteBackend(InferenceBackend):
+    """
+    TensorFlow Lite flatbuffer, float or INT8-quantized.
+
+    The interpreter is not thread-safe, so calls are serialized; the input
+    tensor is resized whenever the batch size changes.
+    """
+    name = "tflite"
+
+    def load(self):
+        Interpreter = _load_tflite_interpreter()
+        self.interpreter = Interpreter(
+            model_path=self.model_path, num_threads=self.num_threads or None
+        )
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()
+
+    def predict(self, img_batch):
+        with self._lock:
+            if len(img_batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input["index"], img_batch.shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = len(img_batch)
+
+            inputs = img_batch
+            if self._input["dtype"] != np.float32:
+                # Fully integer model: quantize with the input tensor's scale
+                scale, zero_point = self._input["quantization"]
+                info = np.iinfo(self._input["dtype"])
+                inputs = np.clip(np.round(img_batch / scale + zero_point), info.min, info.max)
+                inputs = inputs.astype(self._input["dtype"])
+            self.interpreter.set_tensor(self._input["index"], inputs)
+            self.interpreter.invoke()
+            outputs = self.interpreter.get_tensor(self._output["index"])
+
+            if self._output["dtype"] != np.float32:
+                scale, zero_point = self._output["quantization"]
+                return (outputs.astype(np.float32) - zero_point) * scale
+            return outputs.copy()
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime session on the CPU execution provider."""
+    name = "onnx"
+
+    def load(self):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The onnx backend requires onnxruntime (pip install onnxruntime)")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, img_batch):
+        return self.session.run(None, {self._input_name: img_batch})[0]
+
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+def create_backend(name, model_path, num_threads=0, explain_layer=None):
+    """Instantiate the backend registered under ``name`` (not loaded yet)."""
+    try:
+        backend_cls = BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return backend_cls(model_path, num_threads=num_threads, explain_layer=explain_layer)
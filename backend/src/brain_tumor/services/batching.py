@@ -0,0 +1,28 @@
+import asyncio
+
+STOP = object()  # queued by close() so a worker exits after what precedes it
+
+async def collect_batch(queue, max_batch_size, max_wait):
+    """
+    Take the next batch off an asyncio queue: the first item, waiting as
+    long as it takes, then whatever else arrives within ``max_wait`` seconds
+    of it, up to ``max_batch_size`` items. Returns the batch and whether a
+    ``STOP`` sentinel ended it.
+    """
+    loop = asyncio.get_running_loop()
+    item = await queue.get()
+    batch = []
+    deadline = loop.time() + max_wait
+    while item is not STOP:
+        batch.append(item)
+        if len(batch) >= max_batch_size:
+            return batch, False
+        timeout = deadline - loop.time()
+        try:
+            if timeout <= 0:
+                item = queue.get_nowait()
+            else:
+                item = await asyncio.wait_for(queue.get(), timeout)
+        except (asyncio.QueueEmpty, asyncio.TimeoutError):
+            return batch, False
+    return batch, True
@@ -0,0 +1,296 @@
+import logging
+import os
+import queue
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.services.backends import InferenceBackend, create_backend
+from src.brain_tumor.services.explanations import ExplanationUnavailableError
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 8 * 1024 * 1024  # bytes; a channel's segment grows with the largest batch
+_ALIGNMENT = 64
+
+def _as_bytes(authkey):
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+def release_shared_memory(shm):
+    """Close and unlink a segment this process created."""
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        # Before Python 3.13 the server registers attached segments with its
+        # resource tracker too, which unlinks them if the server exits first
+        pass
+
+def write_arrays(buffer, arrays):
+    """Copy arrays one after another into ``buffer``; returns their (offset, shape, dtype) layout."""
+    layout = []
+    offset = 0
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        if offset + array.nbytes > len(buffer):
+            raise ValueError("Outputs do not fit in the shared buffer")
+        np.ndarray(array.shape, array.dtype, buffer=buffer, offset=offset)[...] = array
+        layout.append((offset, array.shape, array.dtype.str))
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    return layout
+
+def read_arrays(buffer, layout):
+    """Copy the arrays described by ``layout`` out of ``buffer``."""
+    return [np.ndarray(shape, np.dtype(dtype), buffer=buffer, offset=offset).copy()
+            for offset, shape, dtype in layout]
+
+class InferenceServer:
+    """
+    Owns the models for all HTTP workers on a host.
+
+    Each worker connection sends ``attach`` with the name of a shared memory
+    segment it created and the model it serves, then ``predict`` or
+    ``explain`` messages carrying only a batch shape: the float32 batch is
+    read from the segment and the outputs are written back into it. Models
+    are loaded once per (model_path, backend) and shared by all connections,
+    each of which is served on a thread of its own. Connections must prove
+    they know ``authkey`` before anything they send is unpickled.
+    """
+    def __init__(self, address, authkey, num_threads=0, explain_layer=None):
+        if not authkey:
+            raise ValueError("The inference server needs an authkey")
+        self.address = address
+        self.authkey = _as_bytes(authkey)
+        self.num_threads = num_threads
+        self.explain_layer = explain_layer
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def backend(self, model_path, backend_name):
+        """Return the loaded backend for a model, loading it on first use."""
+        key = (model_path, backend_name)
+        with self._lock:
+            backend = self._backends.get(key)
+            if backend is None:
+                backend = create_backend(backend_name, model_path, num_threads=self.num_threads,
+                                         explain_layer=self.explain_layer)
+                backend.load()
+                self._backends[key] = backend
+                logger.info("Inference server loaded %s model from %s", backend_name, model_path)
+        return backend
+
+    def listen(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # left behind by a previous run
+        listener = Listener(self.address, family="AF_UNIX")
+        os.chmod(self.address, 0o600)
+        return listener
+
+    def serve_forever(self, listener):
+        logger.info("Inference server listening on %s", self.address)
+        with listener:
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        state = {"shm": None, "backend": None}
+        try:
+            # The handshake Listener(authkey=...) would run in accept(), done here
+            # so that a client which never answers cannot hold up the others
+            try:
+                deliver_challenge(conn, self.authkey)
+                answer_challenge(conn, self.authkey)
+            except (AuthenticationError, EOFError, OSError) as e:
+                logger.warning("Rejected an inference server connection: %s", e)
+                return
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(("ok", self._handle(state, message)))
+                except Exception as e:
+                    conn.send(("error", type(e).__name__, str(e)))
+        finally:
+            conn.close()
+            if state["shm"] is not None:
+                state["shm"].close()
+
+    def _handle(self, state, message):
+        op = message[0]
+        if op == "attach":
+            _, shm_name, model_path, backend_name = message
+            backend = self.backend(model_path, backend_name)
+            shm = SharedMemory(name=shm_name)
+            if state["shm"] is not None:
+                state["shm"].close()
+            state["shm"], state["backend"] = shm, backend
+            return {"supports_explanations": backend.supports_explanations}
+        if op in ("predict", "explain"):
+            _, shape = message
+            shm, backend = state["shm"], state["backend"]
+            if shm is None:
+                raise RuntimeError("Connection has no attached buffer")
+            img_batch = np.ndarray(shape, np.float32, buffer=shm.buf)
+            if op == "predict":
+                outputs = [backend.predict(img_batch)]
+            else:
+                outputs = backend.explain(img_batch)
+            del img_batch  # outputs overwrite the inputs
+            return write_arrays(shm.buf, outputs)
+        raise ValueError(f"Unknown inference server operation '{op}'")
+
+class _Channel:
+    """One connection to the inference server and the segment its batches go through."""
+    def __init__(self, address, model_path, backend_name, authkey):
+        self.model_path = model_path
+        self.backend_name = backend_name
+        self.shm = None
+        self.conn = Client(address, family="AF_UNIX", authkey=authkey)
+        self.info = self._attach(INITIAL_CAPACITY)
+
+    def _attach(self, capacity):
+        shm = SharedMemory(create=True, size=capacity)
+        try:
+            self.conn.send(("attach", shm.name, self.model_path, self.backend_name))
+            info = self._reply()
+        except BaseException:
+            release_shared_memory(shm)
+            raise
+        if self.shm is not None:
+            release_shared_memory(self.shm)
+        self.shm = shm
+        return info
+
+    def _reply(self):
+        reply = self.conn.recv()
+        if reply[0] == "ok":
+            return reply[1]
+        _, kind, message = reply
+        if kind == ExplanationUnavailableError.__name__:
+            raise ExplanationUnavailableError(message)
+        raise RuntimeError(f"Inference server error: {message}")
+
+    def call(self, op, img_batch):
+        if img_batch.nbytes > self.shm.size:
+            self._attach(max(img_batch.nbytes, 2 * self.shm.size))
+        np.ndarray(img_batch.shape, np.float32, buffer=self.shm.buf)[...] = img_batch
+        self.conn.send((op, img_batch.shape))
+        return read_arrays(self.shm.buf, self._reply())
+
+    def close(self):
+        self.conn.close()
+        if self.shm is not None:
+            release_shared_memory(self.shm)
+            self.shm = None
+
+class RemoteBackend(InferenceBackend):
+    """
+    Runs ``backend_name`` models in the inference server at ``address``.
+
+    Concurrent calls (micro-batches, batch uploads, heatmaps) each take a
+    channel of their own; channels are opened on demand and reused.
+    ``authkey`` is the server's shared secret. Channels still in use when
+    ``close`` runs are closed as their calls return.
+    """
+    name = "remote"
+
+    def __init__(self, address, model_path, backend_name, num_threads=0, explain_layer=None, authkey=None):
+        super().__init__(model_path, num_threads=num_threads, explain_layer=explain_layer)
+        self.address = address
+        self.backend_name = backend_name
+        self.authkey = _as_bytes(authkey)
+        self._channels = queue.SimpleQueue()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not self.authkey:
+            raise RuntimeError("INFERENCE_SERVER_AUTHKEY must be set to use the inference server")
+        channel = self._open_channel()
+        # The server loads the model while attaching the first channel
+        self.supports_explanations = channel.info["supports_explanations"]
+        self._release(channel)
+
+    def _open_channel(self):
+        try:
+            return _Channel(self.address, self.model_path, self.backend_name, self.authkey)
+        except (OSError, EOFError, AuthenticationError) as e:
+            raise RuntimeError(f"Cannot reach the inference server at {self.address}: {e}")
+
+    def _release(self, channel):
+        # Checked against close() under the lock, so no channel is pooled after it drained
+        with self._lock:
+            if not self._closed:
+                self._channels.put(channel)
+                return
+        channel.close()
+
+    def _call(self, op, img_batch):
+        img_batch = np.ascontiguousarray(img_batch, dtype=np.float32)
+        try:
+            channel = self._channels.get_nowait()
+        except queue.Empty:
+            channel = self._open_channel()
+        try:
+            outputs = channel.call(op, img_batch)
+        except (OSError, EOFError) as e:
+            channel.close()
+            raise RuntimeError(f"Lost the connection to the inference server at {self.address}: {e}")
+        except Exception:
+            # The server answered with an error; the channel is still in step
+            self._release(channel)
+            raise
+        except BaseException:
+            channel.close()
+            raise
+        self._release(channel)
+        return outputs
+
+    def predict(self, img_batch):
+        return self._call("predict", img_batch)[0]
+
+    def explain(self, img_batch):
+        if not self.supports_explanations:
+            raise ExplanationUnavailableError(f"The {self.backend_name} backend cannot compute heatmaps")
+        probabilities, cams = self._call("explain", img_batch)
+        return probabilities, cams
+
+    def summary(self, print_fn=print):
+        print_fn(f"{self.backend_name} backend in the inference server at {self.address}: {self.model_path}")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._channels.get_nowait().close()
+            except queue.Empty:
+                return
+
+def run_server(address, preload=(), ready=None, authkey=None):
+    """
+    Run an inference server until the process is stopped. ``preload`` lists
+    (model_path, backend_name) pairs to load before accepting connections;
+    ``ready`` (a multiprocessing Event) is set once it accepts them.
+    ``authkey`` defaults to the INFERENCE_SERVER_AUTHKEY setting.
+    """
+    settings = get_settings()
+    logging.basicConfig(level=logging.DEBUG if settings.DEBUG else logging.INFO)
+    authkey = authkey or settings.INFERENCE_SERVER_AUTHKEY
+    if not authkey:
+        raise RuntimeError("Set INFERENCE_SERVER_AUTHKEY to a shared secret for the inference server")
+    server = InferenceServer(address, authkey, num_threads=settings.INFERENCE_THREADS,
+                             explain_layer=settings.EXPLAIN_LAYER or None)
+    for model_path, backend_name in preload:
+        server.backend(model_path, backend_name)
+    listener = server.listen()
+    if ready is not None:
+        ready.set()
+    server.serve_forever(listener)
@@ -0,0 +1,139 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond decode steps up to multi-second model loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format, thread-safe."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def collect(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', bound))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', '+Inf'))} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+class Gauge:
+    """Gauge whose value is read from ``getter`` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, getter):
+        self.name = name
+        self.documentation = documentation
+        self.getter = getter
+
+    def collect(self):
+        value = self.getter()
+        if value is not None:
+            yield f"{self.name} {value}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        # Re-registering by name replaces the metric, e.g. when a service is rebuilt
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, getter):
+        return self.register(Gauge(name, documentation, getter))
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# Per-stage timings of a prediction request
+STAGE_SECONDS = REGISTRY.histogram(
+    "brain_tumor_stage_seconds",
+    "Time spent in each stage of a prediction request",
+    labelnames=("stage",),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "brain_tumor_http_request_seconds",
+    "Total HTTP request time by route and status",
+    labelnames=("method", "route", "status"),
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "brain_tumor_inference_batch_size",
+    "Images per forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import random
+
+from src.brain_tumor.services.metrics import REGISTRY
+from src.brain_tumor.services.model_service import ModelService
+
+logger = logging.getLogger(__name__)
+
+class UnknownModelVersionError(KeyError):
+    """Raised when a request names a model version that is not loaded."""
+    def __init__(self, version):
+        super().__init__(version)
+        self.version = version
+
+    def __str__(self):
+        return f"Model version '{self.version}' is not loaded"
+
+def parse_model_specs(text):
+    """
+    Parse "version=model_path[|classes_path[|backend]]" entries separated by
+    commas into (version, model_path, classes_path, backend) tuples.
+    """
+    specs = []
+    for entry in filter(None, (part.strip() for part in text.split(","))):
+        version, _, rest = entry.partition("=")
+        if not version or not rest:
+            raise ValueError(f"Invalid model spec '{entry}', expected version=model_path")
+        parts = rest.split("|") + [None, None]
+        specs.append((version.strip(), parts[0], parts[1] or None, parts[2] or None))
+    return specs
+
+def parse_weights(text):
+    """Parse "v1=90,v2=10" into {"v1": 90.0, "v2": 10.0}."""
+    weights = {}
+    for entry in filter(None, (part.strip() for part in text.split(","))):
+        version, _, weight = entry.partition("=")
+        weights[version.strip()] = float(weight)
+    return weights
+
+class ModelRegistry:
+    """
+    Loaded model versions and the routing between them.
+
+    ``deploy`` loads and warms a version off to the side and only then swaps
+    it in, replacing the version map as a whole, so a request always sees
+    either the old or the new service, never a half-loaded one. Requests
+    already running on a replaced service finish on it before it is closed.
+
+    Requests are routed to an explicitly requested version, otherwise by
+    ``weights``. When the default version has a weight of its own, weights
+    are relative (they need not sum to 100); otherwise they are percentages
+    of traffic and the default version takes the rest, so deploying a canary
+    with weight 10 sends it 10% of requests.
+    All versions share one worker pool. ``on_replace(version)`` runs after a
+    loaded version was replaced by a redeploy.
+    """
+    def __init__(self, default_version, pool, on_replace=None):
+        self.default_version = default_version
+        self.pool = pool
+        self.on_replace = on_replace
+        self.weights = {}
+        self._services = {}
+        self._deployments = {}  # version -> {"status": ..., "error": ...} for background loads
+        self._tasks = set()
+        self._lock = asyncio.Lock()
+
+    def create_service(self, version, model_path, class_dict_path=None, backend_name=None):
+        return ModelService(
+            model_path=model_path,
+            model_version=version,
+            class_dict_path=class_dict_path,
+            backend_name=backend_name,
+            pool=self.pool,
+        )
+
+    def add(self, service):
+        """Register a service as is, e.g. the default one before its warm-up."""
+        self._services = {**self._services, service.model_version: service}
+        return service
+
+    @property
+    def versions(self):
+        return list(self._services)
+
+    @property
+    def default(self):
+        return self._services[self.default_version]
+
+    def get(self, version=None):
+        """Return the service for ``version``, or the default one."""
+        service = self._services.get(version or self.default_version)
+        if service is None:
+            raise UnknownModelVersionError(version or self.default_version)
+        return service
+
+    def route(self, requested_version=None):
+        """Pick the service for one request."""
+        if requested_version:
+            return self.get(requested_version)
+        weights = self.traffic_weights()
+        if weights:
+            versions = list(weights)
+            return self.get(random.choices(versions, weights=[weights[v] for v in versions])[0])
+        return self.default
+
+    def traffic_weights(self, weights=None, default_version=None):
+        """Return ``weights`` with the default version's share filled in when it has none."""
+        weights = dict(self.weights if weights is None else weights)
+        default_version = default_version or self.default_version
+        if weights and default_version not in weights:
+            weights[default_version] = max(0.0, 100.0 - sum(weights.values()))
+        return weights
+
+    def traffic_shares(self):
+        """Return the fraction of routed requests each weighted version receives."""
+        weights = self.traffic_weights()
+        total = sum(weights.values())
+        return {version: weight / total for version, weight in weights.items()} if total else {}
+
+    def check_weights(self, weights, default_version=None, pending=()):
+        """
+        Raise if ``weights`` cannot be routed: unknown versions (other than
+        ``pending`` deployments), negative weights, percentages above 100
+        while the default version is unweighted, or nothing positive.
+        """
+        default_version = default_version or self.default_version
+        for version, weight in weights.items():
+            if version not in self._services and version not in pending:
+                raise UnknownModelVersionError(version)
+            if weight < 0:
+                raise ValueError(f"Weight for '{version}' must not be negative")
+        if weights and default_version not in weights and sum(weights.values()) > 100:
+            raise ValueError(
+                f"Weights are percentages while the default version '{default_version}' has none "
+                "of its own and must not add up to more than 100"
+            )
+        if weights and sum(self.traffic_weights(weights, default_version).values()) <= 0:
+            raise ValueError("At least one weight must be positive")
+
+    def set_routing(self, weights=None, default_version=None):
+        """Replace the routing weights and/or the default version."""
+        if default_version is not None and default_version not in self._services:
+            raise UnknownModelVersionError(default_version)
+        self.check_weights(self.weights if weights is None else weights, default_version)
+        if weights is not None:
+            self.weights = dict(weights)
+        if default_version is not None:
+            self.default_version = default_version
+
+    async def deploy(self, version, model_path, class_dict_path=None, backend_name=None,
+                     weight=None, make_default=False):
+        """Load and warm up ``version``, then swap it in atomically."""
+        self._check_deploy_weight(version, weight, make_default)
+        self._deployments[version] = {"status": "loading", "error": None}
+        service = self.create_service(version, model_path, class_dict_path, backend_name)
+        try:
+            await service.warm_up()
+        except Exception as e:
+            self._deployments[version] = {"status": "failed", "error": str(e)}
+            await service.close()
+            raise
+
+        async with self._lock:
+            previous = self._services.get(version)
+            self.add(service)
+            if weight is not None:
+                self.weights = {**self.weights, version: weight}
+            if make_default:
+                self.default_version = version
+        self._deployments.pop(version, None)
+        logger.info("Deployed model version %s from %s", version, model_path)
+
+        if previous is not None:
+            if self.on_replace is not None:
+                self.on_replace(version)
+            await previous.close()
+        return service
+
+    def _check_deploy_weight(self, version, weight, make_default):
+        if weight is not None:
+            self.check_weights({**self.weights, version: weight},
+                               version if make_default else None, pending=[version])
+
+    def deploy_in_background(self, *args, **kwargs):
+        """
+        Start ``deploy`` as a task; progress shows up in ``stats``. An invalid
+        ``weight`` raises here, before anything is loaded.
+        """
+        self._check_deploy_weight(args[0], kwargs.get("weight"), kwargs.get("make_default", False))
+        self._deployments[args[0]] = {"status": "loading", "error": None}
+        task = asyncio.create_task(self._deploy_logged(*args, **kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _deploy_logged(self, version, *args, **kwargs):
+        try:
+            await self.deploy(version, *args, **kwargs)
+        except Exception as e:
+            logger.error("Deploying model version %s failed: %s", version, e)
+
+    def is_deploying(self, version):
+        return self._deployments.get(version, {}).get("status") == "loading"
+
+    async def retire(self, version):
+        """Unload a version other than the default and drop its routing weight."""
+        if version == self.default_version:
+            raise ValueError("The default model version cannot be retired")
+        async with self._lock:
+            service = self.get(version)
+            self._services = {v: s for v, s in self._services.items() if v != version}
+            self.weights = {v: w for v, w in self.weights.items() if v != version}
+        await service.close()
+
+    def register_metrics(self, registry=REGISTRY):
+        """Expose queue depths and the default version's load time as gauges."""
+        registry.gauge("brain_tumor_model_load_seconds", "Time taken to load the default model",
+                       lambda: self.default.load_seconds)
+        registry.gauge("brain_tumor_model_ready", "1 once the default model is loaded and warmed up",
+                       lambda: int(self.default.ready))
+        registry.gauge("brain_tumor_model_versions", "Model versions currently loaded",
+                       lambda: len(self._services))
+        registry.gauge("brain_tumor_inference_pending", "Requests admitted to the inference pool",
+                       lambda: self.pool.pending)
+        registry.gauge("brain_tumor_batch_queue_depth", "Images waiting for the micro-batchers",
+                       lambda: sum(s.batcher.pending for s in self._services.values() if s.batcher is not None))
+
+    def stats(self):
+        return {
+            "default_version": self.default_version,
+            "weights": self.weights,
+            "traffic": self.traffic_shares(),
+            "versions": {
+                version: {
+                    "model_path": service.model_path,
+                    "backend": service.backend_name,
+                    "ready": service.ready,
+                    "load_seconds": service.load_seconds,
+                    "classes": {str(k): v for k, v in service.classes.items()}
+                    if isinstance(service.classes, dict) else list(service.classes),
+                }
+                for version, service in self._services.items()
+            },
+            "deployments": self._deployments,
+        }
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        for service in self._services.values():
+            await service.close()
+        self.pool.shutdown()
@@ -1,22 +1,176 @@
-import tensorflow as tf
 import numpy as np
-from PIL import Image
-import io
+import asyncio
 import logging
 import os
+import time
+from collections import deque
 from src.brain_tumor.config.setting import get_settings
+from src.brain_tumor.services.backends import create_backend
+from src.brain_tumor.services.batching import STOP, collect_batch
+from src.brain_tumor.services.explanations import ExplanationUnavailableError, encode_heatmap
+from src.brain_tumor.services.inference_server import RemoteBackend
+from src.brain_tumor.services.metrics import BATCH_SIZE, STAGE_SECONDS
+from src.brain_tumor.services.preprocessing import (
+    BatchBuffer, InvalidImageError, augment_views, decode_image_timed, to_model_input
+)
+from src.brain_tumor.services.worker_pool import WorkerPool
+
+settings = get_settings()
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-settings = get_settings()
+TUMOR_INFO = {
+    "glioma": "A tumor that originates from glial cells in the brain or spine.",
+    "meningioma": "A tumor that forms on membranes covering the brain and spinal cord.",
+    "notumor": "No evidence of tumor detected in the brain scan.",
+    "pituitary": "A growth in the pituitary gland, which may affect hormone levels."
+}
+
+def aggregate_passes(probabilities):
+    """
+    Average (passes, num_classes) probabilities from TTA views or ensemble
+    members. Returns the mean row and how much the passes disagree:
+    ``uncertainty`` is the mean's entropy scaled to 0..1, ``mutual_information``
+    the part of it due to disagreement between passes, ``agreement`` the share
+    of passes voting for the mean's top class and ``confidence_std`` the spread
+    of that class's probability.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    mean = probabilities.mean(axis=0)
+    num_classes = probabilities.shape[1]
+    entropy = -np.sum(mean * np.log(np.clip(mean, 1e-12, None)))
+    pass_entropy = -np.sum(probabilities * np.log(np.clip(probabilities, 1e-12, None)), axis=1).mean()
+    class_index = int(np.argmax(mean))
+    return mean, {
+        "uncertainty": float(entropy / np.log(num_classes)) if num_classes > 1 else 0.0,
+        "mutual_information": float(max(entropy - pass_entropy, 0.0)),
+        "agreement": float(np.mean(probabilities.argmax(axis=1) == class_index)),
+        "confidence_std": float(probabilities[:, class_index].std()),
+    }
+
+class BatchMetrics:
+    """Running counters for batch sizes and queue wait times."""
+    def __init__(self, window=1000):
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = {}
+        self.queue_waits = deque(maxlen=window)  # seconds, most recent requests only
+        self.max_queue_wait = 0.0
+
+    def record(self, batch_size, waits):
+        self.batches += 1
+        self.items += batch_size
+        self.batch_sizes[batch_size] = self.batch_sizes.get(batch_size, 0) + 1
+        self.queue_waits.extend(waits)
+        if waits:
+            self.max_queue_wait = max(self.max_queue_wait, max(waits))
+
+    def snapshot(self):
+        """Return the current metrics as a JSON-friendly dict."""
+        waits_ms = np.asarray(self.queue_waits, dtype=np.float64) * 1000.0
+        if waits_ms.size:
+            p50, p95, p99 = np.percentile(waits_ms, [50, 95, 99])
+        else:
+            p50 = p95 = p99 = 0.0
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "queue_wait_ms": {
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+                "max": round(self.max_queue_wait * 1000.0, 3),
+            },
+        }
+
+class MicroBatcher:
+    """
+    Collect concurrent single-image requests into one batch per forward pass.
+
+    A batch is dispatched when it reaches ``max_batch_size`` or when the oldest
+    queued request has waited ``max_wait_ms``. While a batch is running, new
+    requests keep queueing, so batches grow naturally with load.
+
+    ``predict_fn`` receives the list of queued arrays and stacks them itself,
+    on the executor thread, and must return one output row (or list item)
+    per image.
+    """
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, executor=None):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.metrics = BatchMetrics()
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, img_array):
+        """Queue a (1, H, W, C) array and wait for its (1, num_classes) output."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((img_array, future, time.perf_counter()))
+        return await future
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self):
+        while True:
+            batch, stop = await collect_batch(self._queue, self.max_batch_size, self.max_wait)
+            # Requests whose callers went away do not need a slot in the batch
+            batch = [item for item in batch if not item[1].done()]
+            if batch:
+                await self._dispatch(batch)
+            if stop:
+                return
+
+    async def _dispatch(self, batch):
+        started = time.perf_counter()
+        self.metrics.record(len(batch), [started - queued for _, _, queued in batch])
+        try:
+            inputs = [img_array for img_array, _, _ in batch]
+            outputs = await asyncio.get_running_loop().run_in_executor(self.executor, self.predict_fn, inputs)
+        except Exception as e:
+            logger.error("Batched prediction failed: %s", e)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for i, (_, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result(outputs[i:i + 1])
+
+    async def close(self):
+        """Let the worker finish what is queued, then stop it."""
+        if self._worker is not None and not self._worker.done():
+            # A sentinel rather than cancel(): cancelling inside wait_for can be swallowed
+            await self._queue.put(STOP)
+            await self._worker
+        self._worker = None
 
 class ModelService:
-    def __init__(self):
+    """
+    One loaded model version: its backend, class dict and micro-batcher.
+
+    Arguments default to the MODEL_* settings. Versions served side by side
+    share one ``pool`` so admission control covers all of them; a service
+    only shuts down a pool it created itself.
+    """
+    def __init__(self, model_path=None, model_version=None, class_dict_path=None,
+                 backend_name=None, pool=None):
         self.model = None
-        self.model_path = settings.MODEL_PATH
-        self.class_dict_path = settings.CLASSES_PATH
+        self.model_path = model_path or settings.MODEL_PATH
+        self.backend_name = backend_name or settings.INFERENCE_BACKEND
+        self.model_version = model_version or settings.MODEL_VERSION
+        self.class_dict_path = class_dict_path or settings.CLASSES_PATH
         self.image_size = (224, 224)  # Standard size for most CNN models
         # Default classes as fallback
         self.classes = {
@@ -26,46 +180,188 @@ class ModelService:
             3: "pituitary"
         }
         self.accuracy = 98.00  # Approximate model accuracy
+        self.ready = False
+        self.load_seconds = None
+        self._class_names = None  # index -> name, resolved on the first result
+        self._class_fields = {}
+        self._load_lock = asyncio.Lock()
+        self._owns_pool = pool is None
+        self.pool = pool or WorkerPool(
+            kind=settings.INFERENCE_EXECUTOR,
+            workers=settings.INFERENCE_WORKERS,
+            max_pending=settings.INFERENCE_MAX_PENDING,
+            retry_after=settings.INFERENCE_RETRY_AFTER,
+        )
+        self.batcher = None
+        if settings.BATCHING_ENABLED:
+            # Reused for every micro-batch, which run one at a time
+            self.batch_buffer = BatchBuffer(settings.BATCH_MAX_SIZE, self.image_size)
+            self.batcher = MicroBatcher(
+                self._predict_buffered,
+                max_batch_size=settings.BATCH_MAX_SIZE,
+                max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                executor=self.pool.thread_executor,
+            )
+        self.explain_batcher = None  # created by the first explain_image() call
         
     async def load_model(self):
         """Load the model and class dictionary if not already loaded."""
         if self.model is None:
+            # Concurrent first callers wait for a single load instead of racing
+            async with self._load_lock:
+                if self.model is None:
+                    await self.pool.run_inference(self._load_model_sync)
+        return self.model
+
+    def _load_model_sync(self):
+        try:
+            logger.debug("Loading %s model from %s", self.backend_name, self.model_path)
+            started = time.perf_counter()
+            if settings.INFERENCE_SERVER_ADDRESS:
+                # The inference server runs the model; this process only sends it batches
+                model = RemoteBackend(settings.INFERENCE_SERVER_ADDRESS, self.model_path, self.backend_name,
+                                      authkey=settings.INFERENCE_SERVER_AUTHKEY)
+            else:
+                model = create_backend(
+                    self.backend_name, self.model_path,
+                    num_threads=settings.INFERENCE_THREADS, explain_layer=settings.EXPLAIN_LAYER or None
+                )
+            model.load()
+            self.load_seconds = time.perf_counter() - started
+            logger.info("Model loaded with %s backend in %.2fs", self.backend_name, self.load_seconds)
+            
+            # Load class dictionary
             try:
-                logger.debug(f"Loading model from {self.model_path}")
-                self.model = tf.keras.models.load_model(self.model_path)
-                logger.debug("Model loaded successfully")
-                
-                # Load class dictionary
-                try:
-                    if os.path.exists(self.class_dict_path):
-                        loaded_classes = np.load(self.class_dict_path, allow_pickle=True).item()
-                        # Verify the loaded classes are valid
-                        if isinstance(loaded_classes, dict) and loaded_classes:
-                            self.classes = loaded_classes
-                            logger.debug(f"Loaded classes: {self.classes}")
-                        else:
-                            logger.warning(f"Invalid class dict format, using default classes")
+                if os.path.exists(self.class_dict_path):
+                    loaded_classes = np.load(self.class_dict_path, allow_pickle=True).item()
+                    # Verify the loaded classes are valid
+                    if isinstance(loaded_classes, dict) and loaded_classes:
+                        # Training exports name -> index; predictions look up index -> name
+                        if all(isinstance(v, (int, np.integer)) for v in loaded_classes.values()):
+                            loaded_classes = {int(v): k for k, v in loaded_classes.items()}
+                        self.classes = loaded_classes
+                        self._class_names = None
+                        logger.debug("Loaded classes: %s", self.classes)
                     else:
-                        logger.warning(f"Class dict not found at {self.class_dict_path}, using default classes")
-                except Exception as e:
-                    logger.warning(f"Error loading class dict: {e}, using default classes")
-                
-                # Print model summary to verify its structure
-                self.model.summary(print_fn=logger.debug)
+                        logger.warning("Invalid class dict format, using default classes")
+                else:
+                    logger.warning("Class dict not found at %s, using default classes", self.class_dict_path)
             except Exception as e:
-                logger.error(f"Error loading model: {e}")
-                raise RuntimeError(f"Failed to load model from {self.model_path}: {str(e)}")
-        return self.model
-    
+                logger.warning("Error loading class dict: %s, using default classes", e)
+            
+            # Print model summary to verify its structure
+            if settings.DEBUG:
+                model.summary(print_fn=logger.debug)
+            self.model = model
+        except Exception as e:
+            logger.error("Error loading model: %s", e)
+            raise RuntimeError(f"Failed to load model from {self.model_path}: {str(e)}")
+
+    async def warm_up(self, batches=None):
+        """
+        Load the model and run dummy batches so graph tracing happens before
+        the first real request. Sets ``ready`` once finished.
+        """
+        batches = settings.WARMUP_BATCHES if batches is None else batches
+        await self.load_model()
+        # Trace the single-image shape and the largest shape the batcher can produce
+        batch_sizes = [1]
+        if self.batcher is not None and self.batcher.max_batch_size > 1:
+            batch_sizes.append(self.batcher.max_batch_size)
+        started = time.perf_counter()
+        for i in range(batches):
+            size = batch_sizes[i % len(batch_sizes)]
+            dummy = np.zeros((size, *self.image_size, 3), dtype=np.float32)
+            await self.pool.run_inference(self._predict_batch, dummy)
+        self.ready = True
+        logger.info("Model warm-up finished: %s batches in %.2fs", batches, time.perf_counter() - started)
+
+    def _predict_batch(self, img_batch):
+        """Run one forward pass over a stacked (N, H, W, C) batch."""
+        BATCH_SIZE.observe(len(img_batch))
+        with STAGE_SECONDS.time("inference"):
+            return self.model.predict(img_batch)
+
+    def _predict_pixels(self, pixel_arrays):
+        """Stack and normalize decoded uint8 images, then run one forward pass."""
+        with STAGE_SECONDS.time("normalize"):
+            img_batch = to_model_input(pixel_arrays)
+        return self._predict_batch(img_batch)
+
+    def _predict_buffered(self, pixel_arrays):
+        with STAGE_SECONDS.time("normalize"):
+            img_batch = self.batch_buffer.fill(pixel_arrays)
+        return self._predict_batch(img_batch)
+
+    def _explain_pixels(self, pixel_arrays):
+        """Run the Grad-CAM pass over decoded images; returns [(probabilities_row, heatmap)]."""
+        with STAGE_SECONDS.time("normalize"):
+            img_batch = to_model_input(pixel_arrays)
+        with STAGE_SECONDS.time("explain"):
+            probabilities, cams = self.model.explain(img_batch)
+            return [
+                (row, encode_heatmap(cam, settings.EXPLAIN_HEATMAP_SIZE))
+                for row, cam in zip(probabilities, cams)
+            ]
+
+    async def _decode(self, image_bytes):
+        """Decode on the worker pool and record decode/resize timings."""
+        if self.pool.process_executor is not None and isinstance(image_bytes, memoryview):
+            # Views cannot be pickled to a worker process
+            image_bytes = image_bytes.tobytes()
+        pixels, decode_s, resize_s = await self.pool.run_cpu(decode_image_timed, image_bytes, self.image_size)
+        STAGE_SECONDS.observe(decode_s, "decode")
+        STAGE_SECONDS.observe(resize_s, "resize")
+        return pixels
+
+    def batching_stats(self):
+        """Return batch-size and queue-wait metrics of the batching scheduler."""
+        if self.batcher is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "max_batch_size": self.batcher.max_batch_size,
+            "max_wait_ms": self.batcher.max_wait * 1000.0,
+            **self.batcher.metrics.snapshot(),
+        }
+
+    def pool_stats(self):
+        """Return admission and worker counters of the inference pool."""
+        return self.pool.stats()
+
+    async def close(self):
+        """Stop the batching workers and the backend, and the inference pool if this service owns it."""
+        if self.batcher is not None:
+            await self.batcher.close()
+        if self.explain_batcher is not None:
+            await self.explain_batcher.close()
+        if self.model is not None:
+            self.model.close()
+        if self._owns_pool:
+            self.pool.shutdown()
+
     def get_tumor_info(self, class_name):
         """Return information about the tumor type."""
-        tumor_info = {
-            "glioma": "A tumor that originates from glial cells in the brain or spine.",
-            "meningioma": "A tumor that forms on membranes covering the brain and spinal cord.",
-            "notumor": "No evidence of tumor detected in the brain scan.",
-            "pituitary": "A growth in the pituitary gland, which may affect hormone levels."
-        }
-        return tumor_info.get(class_name, "Unknown tumor type.")
+        return TUMOR_INFO.get(class_name, "Unknown tumor type.")
+
+    def class_fields(self, class_name):
+        """Return the per-class result fields (diagnosis, tumor_type, tumor_info), built once per class."""
+        fields = self._class_fields.get(class_name)
+        if fields is None:
+            has_tumor = class_name != "notumor"
+            fields = self._class_fields[class_name] = {
+                "diagnosis": "Brain tumor detected." if has_tumor else "No tumor detected.",
+                "tumor_type": class_name.capitalize() + " Tumor" if has_tumor else "N/A",
+                "tumor_info": self.get_tumor_info(class_name),
+            }
+        return fields
+
+    def class_names(self, num_classes):
+        """Return class names for output indices 0..num_classes-1, resolved once."""
+        names = self._class_names
+        if names is None or len(names) != num_classes:
+            names = self._class_names = [self.get_class_name(i) for i in range(num_classes)]
+        return names
     
     def get_class_name(self, class_index):
         """Safely get class name from index with fallback."""
@@ -86,43 +382,35 @@ class ModelService:
         }
         
         if class_index in default_classes:
-            logger.warning(f"Using default class name for index {class_index}")
+            logger.warning("Using default class name for index %s", class_index)
             return default_classes[class_index]
         
         # Last resort
-        logger.error(f"Unknown class index: {class_index}")
+        logger.error("Unknown class index: %s", class_index)
         return f"unknown_class_{class_index}"
     
     async def predict_image(self, image_bytes):
         """Predict the class of an image from bytes with detailed results."""
         # Load the model if not loaded
-        model = await self.load_model()
+        await self.load_model()
         
+        # Fails fast with ServiceOverloadedError when the pool is saturated
+        with self.pool.admit():
+            return await self._predict_admitted(image_bytes)
+
+    async def _predict_admitted(self, image_bytes):
         try:
-            # Open and preprocess the image
-            logger.debug("Opening image from bytes")
-            image = Image.open(io.BytesIO(image_bytes))
-            image = image.convert("RGB")  # Ensure it's RGB
-            logger.debug(f"Original image size: {image.size}")
-            
-            # Resize the image
-            image = image.resize(self.image_size)
-            logger.debug(f"Resized image to: {image.size}")
-            
-            # Convert to array and normalize
-            img_array = tf.keras.preprocessing.image.img_to_array(image)
-            logger.debug(f"Image array shape: {img_array.shape}")
-            
-            img_array = np.expand_dims(img_array, axis=0)
-            logger.debug(f"Expanded array shape: {img_array.shape}")
-            
-            img_array = img_array / 255.0
+            # Decode off the event loop; normalization happens per batch
+            pixels = await self._decode(image_bytes)
             
             # Make prediction
-            logger.debug("Making prediction")
-            predictions = model.predict(img_array)
-            logger.debug(f"Raw prediction: {predictions}")
-            logger.debug(f"Prediction shape: {predictions.shape}")
+            if self.batcher is not None:
+                predictions = await self.batcher.submit(pixels)
+            else:
+                predictions = await self.pool.run_inference(self._predict_pixels, [pixels])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw prediction: %s", predictions)
+                logger.debug("Prediction shape: %s", predictions.shape)
             
             # If prediction is empty or unexpected format, raise error
             if predictions.size == 0:
@@ -130,40 +418,195 @@ class ModelService:
             
             # Process prediction and create detailed report
             if len(predictions) > 0 and len(predictions[0]) > 0:
-                class_index = int(np.argmax(predictions[0]))
-                class_name = self.get_class_name(class_index)
-                confidence = float(predictions[0][class_index])
-                
-                logger.debug(f"Class index: {class_index}, Class: {class_name}")
-                logger.debug(f"Confidence: {confidence}")
-                
-                # Create probabilities dictionary
-                probabilities = {}
-                for i in range(len(predictions[0])):
-                    class_key = self.get_class_name(i)
-                    probabilities[class_key] = float(predictions[0][i])
-                
-                # Determine diagnosis
-                has_tumor = class_name != "notumor"
-                diagnosis = "Brain tumor detected." if has_tumor else "No tumor detected."
-                
-                # Create detailed result
-                result = {
-                    "prediction": class_name,
-                    "confidence": confidence,
-                    "model_accuracy": self.accuracy,
-                    "diagnosis": diagnosis,
-                    "tumor_type": class_name.capitalize() + " Tumor" if has_tumor else "N/A",
-                    "tumor_info": self.get_tumor_info(class_name),
-                    "class_probabilities": probabilities
-                }
-                
-                return result
+                return self._build_result(predictions[0])
             else:
                 # Detailed error for debugging
-                logger.error(f"Prediction array has unexpected structure: {predictions}")
+                logger.error("Prediction array has unexpected structure: %s", predictions)
                 raise ValueError(f"Model returned unexpected prediction format. Shape: {predictions.shape}")
                 
+        except InvalidImageError:
+            raise
         except Exception as e:
-            logger.error(f"Error processing image: {str(e)}")
-            raise RuntimeError(f"Error processing image: {str(e)}")
\ No newline at end of file
+            logger.error("Error processing image: %s", e)
+            raise RuntimeError(f"Error processing image: {str(e)}")
+
+    async def explain_image(self, image_bytes):
+        """
+        Predict one image and compute its Grad-CAM heatmap from the same
+        forward pass; returns (result, heatmap). Explained requests are
+        batched separately, so plain predictions never wait on gradients.
+        """
+        await self.load_model()
+        if not self.model.supports_explanations:
+            raise ExplanationUnavailableError(
+                f"Model version {self.model_version} runs on the {self.backend_name} backend, "
+                "which cannot compute heatmaps"
+            )
+        
+        with self.pool.admit():
+            try:
+                pixels = await self._decode(image_bytes)
+                if settings.BATCHING_ENABLED:
+                    if self.explain_batcher is None:
+                        self.explain_batcher = MicroBatcher(
+                            self._explain_pixels,
+                            max_batch_size=settings.BATCH_MAX_SIZE,
+                            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                            executor=self.pool.thread_executor,
+                        )
+                    explained = await self.explain_batcher.submit(pixels)
+                else:
+                    explained = await self.pool.run_inference(self._explain_pixels, [pixels])
+                probabilities_row, heatmap = explained[0]
+                return self._build_result(probabilities_row), heatmap
+            except (ExplanationUnavailableError, InvalidImageError):
+                # e.g. no convolutional layer to explain or a corrupt upload; client errors, not failures
+                raise
+            except Exception as e:
+                logger.error("Error explaining image: %s", e)
+                raise RuntimeError(f"Error explaining image: {str(e)}")
+
+    async def predict_image_tta(self, image_bytes, views=("original", "hflip"), crop_fraction=0.9, members=(),
+                                explained=None):
+        """
+        Predict one image from several augmented ``views`` (see
+        ``preprocessing.TTA_VIEWS``) and, for an ensemble, with the further
+        model versions in ``members`` too. Each model scores all views in one
+        batched forward pass and the models run concurrently, so the cost is
+        close to one batched call per model. ``class_probabilities`` is the
+        mean over all passes; the result adds ``uncertainty`` and an
+        ``ensemble`` summary of the passes.
+
+        ``explained`` is this model's result for the same image from
+        ``explain_image``; its probabilities stand in for the "original" view
+        instead of scoring that view again.
+        """
+        services = [self] + [member for member in members if member is not self]
+        for service in services:
+            await service.load_model()
+        
+        with self.pool.admit():
+            try:
+                pixels = await self._decode(image_bytes)
+                with STAGE_SECONDS.time("augment"):
+                    augmented = augment_views(pixels, views, crop_fraction)
+                passes = []
+                own = augmented
+                if explained is not None and "original" in views:
+                    passes.append(np.array([list(explained["class_probabilities"].values())], dtype=np.float32))
+                    own = [array for view, array in zip(views, augmented) if view != "original"]
+                jobs = [(service, own if service is self else augmented) for service in services]
+                passes.extend(await asyncio.gather(
+                    *[service.pool.run_inference(service._predict_pixels, batch) for service, batch in jobs if batch]
+                ))
+                num_classes = passes[0].shape[1]
+                if any(service.class_names(num_classes) != self.class_names(num_classes) for service in services):
+                    raise ValueError("Ensemble members predict different classes")
+                with STAGE_SECONDS.time("aggregate"):
+                    mean_row, spread = aggregate_passes(np.concatenate(passes, axis=0))
+                    result = self._build_result(mean_row)
+                result["uncertainty"] = spread.pop("uncertainty")
+                result["ensemble"] = {
+                    "views": list(views),
+                    "model_versions": [service.model_version for service in services],
+                    "passes": len(views) * len(services),
+                    **spread,
+                }
+                return result
+            except InvalidImageError:
+                raise
+            except Exception as e:
+                logger.error("Error running test-time augmentation: %s", e)
+                raise RuntimeError(f"Error running test-time augmentation: {str(e)}")
+
+    def _build_result(self, probabilities_row):
+        """Turn one row of class probabilities into the detailed result dict."""
+        probabilities_row = probabilities_row.tolist()
+        names = self.class_names(len(probabilities_row))
+        class_index = max(range(len(probabilities_row)), key=probabilities_row.__getitem__)
+        class_name = names[class_index]
+        confidence = probabilities_row[class_index]
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Class index: %s, Class: %s", class_index, class_name)
+            logger.debug("Confidence: %s", confidence)
+        
+        # Diagnosis and tumor details are fixed per class
+        return {
+            "prediction": class_name,
+            "confidence": confidence,
+            "model_accuracy": self.accuracy,
+            **self.class_fields(class_name),
+            "class_probabilities": dict(zip(names, probabilities_row))
+        }
+
+    async def predict_images(self, images, chunk_size=None):
+        """
+        Predict many images in batched forward passes of at most
+        ``chunk_size`` images (BATCH_MAX_SIZE by default).
+
+        Images are decoded in parallel on the worker pool. The chunks run one
+        after another, which bounds the float32 batch in memory and lets
+        other requests' batches interleave. Returns one entry per input, in
+        order: a result dict, or the exception raised while decoding that
+        image.
+        """
+        await self.load_model()
+        
+        with self.pool.admit():
+            decoded = await asyncio.gather(
+                *[self._decode(image_bytes) for image_bytes in images],
+                return_exceptions=True
+            )
+            results = list(decoded)
+            valid = [i for i, pixels in enumerate(decoded) if not isinstance(pixels, BaseException)]
+            if not valid:
+                return results
+            
+            chunk_size = max(1, chunk_size or settings.BATCH_MAX_SIZE)
+            for start in range(0, len(valid), chunk_size):
+                chunk = valid[start:start + chunk_size]
+                try:
+                    predictions = await self.pool.run_inference(self._predict_pixels, [decoded[i] for i in chunk])
+                except Exception as e:
+                    logger.error("Error running batched prediction: %s", e)
+                    raise RuntimeError(f"Error running batched prediction: {str(e)}")
+                
+                for i, row in zip(chunk, predictions):
+                    results[i] = self._build_result(row)
+            return results
+
+    def summarize_study(self, results):
+        """Aggregate per-slice results into a study-level prediction."""
+        if not results:
+            return {"num_slices": 0}
+        
+        class_names = list(results[0]["class_probabilities"].keys())
+        probabilities = np.array(
+            [[r["class_probabilities"][name] for name in class_names] for r in results]
+        )
+        mean_probabilities = probabilities.mean(axis=0)
+        class_index = int(np.argmax(mean_probabilities))
+        class_name = class_names[class_index]
+        
+        votes = {name: 0 for name in class_names}
+        for r in results:
+            votes[r["prediction"]] = votes.get(r["prediction"], 0) + 1
+        tumor_slices = sum(count for name, count in votes.items() if name != "notumor")
+        
+        fields = self.class_fields(class_name)
+        return {
+            "num_slices": len(results),
+            "prediction": class_name,
+            "confidence": float(mean_probabilities[class_index]),
+            "diagnosis": fields["diagnosis"],
+            "tumor_type": fields["tumor_type"],
+            "tumor_slices": tumor_slices,
+            "slice_votes": votes,
+            "class_probabilities": {
+                name: float(p) for name, p in zip(class_names, mean_probabilities)
+            },
+            "max_class_probabilities": {
+                name: float(p) for name, p in zip(class_names, probabilities.max(axis=0))
+            }
+        }
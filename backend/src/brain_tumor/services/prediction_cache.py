@@ -0,0 +1,99 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class PredictionCache:
+    """
+    Content-addressed cache of prediction results.
+
+    Entries are keyed by a SHA-256 of the raw upload bytes plus the model
+    version, so a retrained model never serves stale results. The first tier
+    is an in-process LRU with a TTL; the optional second tier looks up an
+    earlier prediction document by its indexed ``image_hash`` field.
+    ``model_version`` is the version used when a call does not name one.
+    """
+    def __init__(self, model_version, max_entries=1024, ttl_seconds=3600.0, use_mongo=True):
+        self.model_version = model_version
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.use_mongo = use_mongo
+        self._entries = OrderedDict()  # (model_version, image_hash) -> (expires_at, entry)
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hash_bytes(image_bytes):
+        """Return the content hash used as cache key and stored on predictions."""
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def _get_memory(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, image_hash, result, prediction_id=None, model_version=None):
+        """Store a result, evicting the least recently used entry when full."""
+        key = (model_version or self.model_version, image_hash)
+        entry = {"result": result, "_id": prediction_id}
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, image_hash, db=None, model_version=None):
+        """
+        Return ``{"result": ..., "_id": ...}`` for a known image, or None.
+        ``db`` enables the Mongo tier for this lookup.
+        """
+        model_version = model_version or self.model_version
+        entry = self._get_memory((model_version, image_hash))
+        if entry is not None:
+            self.memory_hits += 1
+            return entry
+
+        if db is not None and self.use_mongo:
+            # Test-time augmented and ensemble results are stored too, but are not plain predictions
+            doc = await db.predictions.find_one(
+                {"image_hash": image_hash, "model_version": model_version, "full_result.ensemble": {"$exists": False}},
+                {"full_result": 1}
+            )
+            if doc is not None and doc.get("full_result"):
+                self.mongo_hits += 1
+                prediction_id = str(doc["_id"])
+                self.put(image_hash, doc["full_result"], prediction_id, model_version)
+                return {"result": doc["full_result"], "_id": prediction_id}
+
+        self.misses += 1
+        return None
+
+    def clear(self, model_version=None):
+        """Drop all entries, or only those of one model version."""
+        if model_version is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == model_version]:
+            del self._entries[key]
+
+    def stats(self):
+        lookups = self.memory_hits + self.mongo_hits + self.misses
+        hits = self.memory_hits + self.mongo_hits
+        return {
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
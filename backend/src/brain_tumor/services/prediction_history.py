@@ -0,0 +1,82 @@
+import base64
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Newest first; _id breaks ties between predictions stored in the same millisecond
+HISTORY_SORT = [("prediction_date", -1), ("_id", -1)]
+
+# Only the fields the history response needs; tumor_info is static per class
+# and image_hash/study_id are internal, so they are not fetched.
+HISTORY_PROJECTION = {
+    "image_name": 1,
+    "prediction": 1,
+    "confidence": 1,
+    "prediction_date": 1,
+    "model_version": 1,
+    "full_result.model_accuracy": 1,
+    "full_result.diagnosis": 1,
+    "full_result.tumor_type": 1,
+    "full_result.class_probabilities": 1,
+}
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(doc):
+    """Return an opaque cursor pointing just after ``doc`` in history order."""
+    raw = f"{doc['prediction_date'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_text, object_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(date_text), ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeDecodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+def build_history_query(prediction=None, start_date=None, end_date=None, cursor=None):
+    """Build the Mongo filter for one page of history."""
+    clauses = []
+    if prediction:
+        clauses.append({"prediction": prediction})
+    if start_date or end_date:
+        date_range = {}
+        if start_date:
+            date_range["$gte"] = start_date
+        if end_date:
+            date_range["$lt"] = end_date
+        clauses.append({"prediction_date": date_range})
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        # Keyset condition matching HISTORY_SORT, served from the compound index
+        clauses.append({"$or": [
+            {"prediction_date": {"$lt": last_date}},
+            {"prediction_date": last_date, "_id": {"$lt": last_id}},
+        ]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def format_prediction(doc, get_tumor_info):
+    """Flatten a projected prediction document into the history response shape."""
+    item = {
+        "_id": doc["_id"],  # ObjectId; serialized as its hex string
+        "image_name": doc.get("image_name"),
+        "prediction": doc.get("prediction"),
+        "confidence": doc.get("confidence"),
+        "prediction_date": doc.get("prediction_date"),
+        "model_version": doc.get("model_version"),
+    }
+    result = doc.get("full_result")
+    if result:
+        item.update({
+            "model_accuracy": result.get("model_accuracy"),
+            "diagnosis": result.get("diagnosis"),
+            "tumor_type": result.get("tumor_type"),
+            "tumor_info": get_tumor_info(item["prediction"]),
+            "class_probabilities": result.get("class_probabilities"),
+        })
+    return item
@@ -0,0 +1,163 @@
+import io
+import logging
+import time
+
+import numpy as np
+from PIL import Image
+
+# This module is imported by process workers, so keep it free of TensorFlow
+logger = logging.getLogger(__name__)
+
+PIXEL_SCALE = np.float32(1.0 / 255.0)
+
+class InvalidImageError(ValueError):
+    """Raised when upload bytes cannot be decoded as an image."""
+
+class MemoryReader(io.RawIOBase):
+    """
+    Seekable read-only file over a buffer. Unlike ``io.BytesIO`` it does not
+    copy a memoryview it is given, so PIL reads straight from the upload buffer.
+    """
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        count = min(len(b), len(self._view) - self._pos)
+        if count <= 0:
+            return 0
+        b[:count] = self._view[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+def decode_image(image_bytes, image_size):
+    """
+    Decode image bytes (or a memoryview of them) into a (1, H, W, 3) uint8 array.
+
+    Large JPEGs are decoded at a reduced DCT scale (``Image.draft``) that is
+    still at least ``image_size``, which skips most of the IDCT work and the
+    full-resolution intermediate image. Pixels stay uint8 here; normalization
+    happens once per batch in ``BatchBuffer.fill`` or ``to_model_input``.
+    """
+    return decode_image_timed(image_bytes, image_size)[0]
+
+def decode_image_timed(image_bytes, image_size):
+    """
+    Like ``decode_image``, also returning (decode_seconds, resize_seconds).
+    Timings travel with the result so process workers can report them too.
+    Undecodable data raises InvalidImageError.
+    """
+    started = time.perf_counter()
+    try:
+        with MemoryReader(image_bytes) as reader:
+            image = Image.open(reader)
+            if image.format == "JPEG":
+                image.draft("RGB", image_size)
+            image = image.convert("RGB")  # Ensure it's RGB; forces the decode
+    except (OSError, Image.DecompressionBombError) as e:
+        # PIL's messages name internal reader objects; keep them out of responses
+        logger.debug("Image decode failed: %s", e)
+        raise InvalidImageError("Image data is corrupt or not a supported image") from None
+    decoded = time.perf_counter()
+    if image.size != image_size:
+        image = image.resize(image_size)
+    pixels = np.asarray(image, dtype=np.uint8)[np.newaxis]
+    return pixels, decoded - started, time.perf_counter() - decoded
+
+def to_model_input(pixel_arrays, out=None):
+    """Stack uint8 (1, H, W, 3) arrays into a normalized float32 batch."""
+    pixels = np.concatenate(pixel_arrays, axis=0)
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.float32)
+    np.multiply(pixels, PIXEL_SCALE, out=out)
+    return out
+
+class BatchBuffer:
+    """
+    Preallocated uint8 and float32 buffers for one batch at a time.
+
+    ``fill`` stacks decoded images into the uint8 buffer and normalizes into
+    the float32 buffer in place, so a steady stream of batches allocates
+    nothing. Callers must not fill again until the previous batch has been
+    consumed; the micro-batcher guarantees this by running one batch at a time.
+    """
+    def __init__(self, max_batch_size, image_size):
+        width, height = image_size
+        self.max_batch_size = max_batch_size
+        self.pixels = np.empty((max_batch_size, height, width, 3), dtype=np.uint8)
+        self.inputs = np.empty((max_batch_size, height, width, 3), dtype=np.float32)
+
+    def fill(self, pixel_arrays):
+        count = sum(len(a) for a in pixel_arrays)
+        if count > self.max_batch_size:
+            return to_model_input(pixel_arrays)
+        np.concatenate(pixel_arrays, axis=0, out=self.pixels[:count])
+        np.multiply(self.pixels[:count], PIXEL_SCALE, out=self.inputs[:count])
+        return self.inputs[:count]
+
+# Test-time augmentation views of a decoded image; crops keep the centre or a corner
+TTA_VIEWS = ("original", "hflip", "vflip", "crop_center", "crop_tl", "crop_tr", "crop_bl", "crop_br")
+
+def parse_tta_views(text):
+    """Parse comma-separated view names, keeping their order; raises ValueError for unknown ones."""
+    views = []
+    for name in (part.strip() for part in text.split(",")):
+        if not name or name in views:
+            continue
+        if name not in TTA_VIEWS:
+            raise ValueError(f"Unknown TTA view '{name}', expected some of {', '.join(TTA_VIEWS)}")
+        views.append(name)
+    return views or ["original"]
+
+def augment_views(pixels, views, crop_fraction=0.9):
+    """
+    Return one (1, H, W, 3) uint8 array per view of a decoded (1, H, W, 3)
+    image. Crops keep ``crop_fraction`` of each side and are resized back to
+    (H, W), so every view stacks into the same batch as the original.
+    """
+    image = pixels[0]
+    height, width = image.shape[:2]
+    crop_height = max(1, min(height, round(height * crop_fraction)))
+    crop_width = max(1, min(width, round(width * crop_fraction)))
+    corners = {
+        "crop_center": ((height - crop_height) // 2, (width - crop_width) // 2),
+        "crop_tl": (0, 0),
+        "crop_tr": (0, width - crop_width),
+        "crop_bl": (height - crop_height, 0),
+        "crop_br": (height - crop_height, width - crop_width),
+    }
+    augmented = []
+    for view in views:
+        if view == "original":
+            view_pixels = image
+        elif view == "hflip":
+            view_pixels = image[:, ::-1]
+        elif view == "vflip":
+            view_pixels = image[::-1]
+        else:
+            top, left = corners[view]
+            crop = Image.fromarray(image[top:top + crop_height, left:left + crop_width])
+            view_pixels = np.asarray(crop.resize((width, height)), dtype=np.uint8)
+        augmented.append(view_pixels[np.newaxis])
+    return augmented
@@ -0,0 +1,44 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # the stdlib fallback is slower but produces the same JSON
+    orjson = None
+
+def default(obj):
+    """Serialize the non-JSON types our responses carry."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    # Numpy arrays natively; int keys such as batch-size histograms as strings
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """Serialize to JSON bytes."""
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(obj):
+        """Serialize to JSON bytes."""
+        return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, handling ObjectId, datetime and numpy
+    values directly. Endpoints returning large dicts can return it themselves
+    to skip FastAPI's ``jsonable_encoder`` pass.
+    """
+    def render(self, content):
+        return dumps(content)
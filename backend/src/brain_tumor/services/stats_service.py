@@ -0,0 +1,182 @@
+import logging
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+STATS_COLLECTION = "prediction_stats"
+TOTALS_ID = "totals"
+GRANULARITIES = ("hour", "day")
+
+def bucket_start(date, granularity):
+    """Truncate a prediction date to the start of its hour or day bucket."""
+    if granularity == "hour":
+        return date.replace(minute=0, second=0, microsecond=0)
+    return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def bucket_id(date, granularity):
+    return f"{granularity}:{bucket_start(date, granularity).isoformat()}"
+
+def format_statistics(total, counts):
+    """Build the /statistics/ response from a total and per-class counts."""
+    type_stats = {}
+    for tumor_type, count in sorted(counts.items(), key=lambda item: -item[1]):
+        percentage = count / total * 100 if total > 0 else 0
+        type_stats[tumor_type] = {
+            "count": count,
+            "percentage": round(percentage, 2)
+        }
+    return {
+        "total_predictions": total,
+        "tumor_types": type_stats,
+        "has_tumor": sum(stats["count"] for tumor_type, stats in type_stats.items()
+                         if tumor_type != "notumor"),
+        "no_tumor": type_stats.get("notumor", {}).get("count", 0)
+    }
+
+async def rebuild_stats(db, indexes=()):
+    """
+    Recompute the counters (totals plus hourly and daily rollups) from
+    ``predictions`` into a scratch collection and swap it in with a rename,
+    so readers never see a half-built state. The totals are stamped with
+    ``rebuilt_at``. Predictions stored while it runs may be missed and
+    their ``$inc`` is lost in the swap, so only ``scripts/rebuild_stats.py``
+    calls this, during a quiet period. Returns {"total": ..., "hour":
+    buckets, "day": buckets}.
+    """
+    scratch = db[f"{STATS_COLLECTION}_rebuild"]
+    await scratch.drop()
+
+    totals = {"_id": TOTALS_ID, "total": 0, "by_class": {}, "rebuilt_at": datetime.utcnow()}
+    pipeline = [{"$group": {"_id": "$prediction", "count": {"$sum": 1}}}]
+    async for row in db.predictions.aggregate(pipeline):
+        totals["total"] += row["count"]
+        totals["by_class"][row["_id"]] = row["count"]
+    documents = [totals]
+    summary = {"total": totals["total"]}
+
+    for granularity in GRANULARITIES:
+        buckets = {}
+        pipeline = [
+            {"$group": {
+                "_id": {
+                    "bucket": {"$dateTrunc": {"date": "$prediction_date", "unit": granularity}},
+                    "prediction": "$prediction",
+                },
+                "count": {"$sum": 1},
+            }}
+        ]
+        async for row in db.predictions.aggregate(pipeline, allowDiskUse=True):
+            bucket = row["_id"]["bucket"]
+            doc = buckets.setdefault(bucket, {
+                "_id": bucket_id(bucket, granularity),
+                "granularity": granularity,
+                "bucket": bucket,
+                "total": 0,
+                "by_class": {},
+            })
+            doc["total"] += row["count"]
+            doc["by_class"][row["_id"]["prediction"]] = row["count"]
+        documents.extend(buckets.values())
+        summary[granularity] = len(buckets)
+
+    await scratch.insert_many(documents)
+    if indexes:
+        await scratch.create_indexes(list(indexes))
+    await scratch.rename(STATS_COLLECTION, dropTarget=True)
+    return summary
+
+class StatsService:
+    """
+    Prediction counters maintained incrementally in ``prediction_stats``.
+
+    Every stored prediction bumps the running totals plus its hourly and daily
+    rollup with ``$inc`` upserts, so reading statistics is a single document
+    lookup. Reads are served from an in-process cache for ``ttl_seconds``.
+
+    ``ensure_totals`` runs at startup and only creates the totals document;
+    predictions older than the counters are counted by
+    ``scripts/rebuild_stats.py``, which recomputes everything on demand.
+    """
+    def __init__(self, ttl_seconds=5.0):
+        self.ttl_seconds = ttl_seconds
+        self._cached = None
+        self._expires_at = 0.0
+
+    async def ensure_totals(self, db):
+        """
+        Create the totals document if it is missing and return whether the
+        counters cover every stored prediction. With no predictions yet the
+        empty counters are complete and stamped as built; otherwise counters
+        never built from ``predictions`` are reported for a rebuild. Safe to
+        run from every worker at once.
+        """
+        stats = db[STATS_COLLECTION]
+        doc = await stats.find_one({"_id": TOTALS_ID}, {"rebuilt_at": 1})
+        if doc is not None and "rebuilt_at" in doc:
+            return True
+        update = {"$setOnInsert": {"total": 0, "by_class": {}}}
+        complete = await db.predictions.find_one({}, {"_id": 1}) is None
+        if complete:
+            # Predictions stored from here on are all counted with $inc
+            update["$set"] = {"rebuilt_at": datetime.utcnow()}
+        await stats.update_one({"_id": TOTALS_ID}, update, upsert=True)
+        if not complete:
+            logger.warning("prediction_stats does not count predictions stored before it existed; "
+                           "run python -m scripts.rebuild_stats during a quiet period")
+        self.invalidate()
+        return complete
+
+    async def record(self, db, predictions):
+        """Count stored predictions, given as (prediction class, prediction_date) pairs."""
+        updates = {}
+        for class_name, date in predictions:
+            targets = [(TOTALS_ID, None)] + [
+                (bucket_id(date, g), {"granularity": g, "bucket": bucket_start(date, g)})
+                for g in GRANULARITIES
+            ]
+            for key, on_insert in targets:
+                counts, _ = updates.setdefault(key, ({"total": 0}, on_insert))
+                counts["total"] += 1
+                field = f"by_class.{class_name}"
+                counts[field] = counts.get(field, 0) + 1
+        if not updates:
+            return
+
+        requests = []
+        for key, (counts, on_insert) in updates.items():
+            update = {"$inc": counts}
+            if on_insert:
+                update["$setOnInsert"] = on_insert
+            requests.append(UpdateOne({"_id": key}, update, upsert=True))
+        await db[STATS_COLLECTION].bulk_write(requests, ordered=False)
+
+    async def get_statistics(self, db):
+        """Return the /statistics/ payload, from cache when fresh."""
+        now = time.monotonic()
+        if self._cached is not None and now < self._expires_at:
+            return self._cached
+
+        doc = await db[STATS_COLLECTION].find_one({"_id": TOTALS_ID}) or {}
+        stats = format_statistics(doc.get("total", 0), doc.get("by_class", {}))
+
+        self._cached = stats
+        self._expires_at = now + self.ttl_seconds
+        return stats
+
+    def invalidate(self):
+        self._cached = None
+
+    async def get_rollups(self, db, granularity="day", start_date=None, end_date=None, limit=100):
+        """Return per-class counts per bucket, newest first."""
+        query = {"granularity": granularity}
+        if start_date or end_date:
+            query["bucket"] = {}
+            if start_date:
+                query["bucket"]["$gte"] = bucket_start(start_date, granularity)
+            if end_date:
+                query["bucket"]["$lt"] = end_date
+        cursor = db[STATS_COLLECTION].find(query, {"_id": 0}).sort("bucket", -1).limit(limit)
+        return await cursor.to_list(length=limit)
@@ -0,0 +1,184 @@
+import json
+import threading
+
+# Leading bytes of the image formats PIL can decode for us
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"BM", "BMP"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+)
+ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06")
+# Enough leading bytes to recognise every signature above, including RIFF/WEBP
+HEADER_BYTES = 16
+
+# Multipart boundaries and part headers on top of the payload itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+class UploadRejectedError(ValueError):
+    """Raised when an upload is too large or is not of an accepted type."""
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def sniff_image_format(header):
+    """Return the image format named by the leading bytes, or None."""
+    header = bytes(header[:HEADER_BYTES])
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    for signature, name in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return name
+    return None
+
+def sniff_archive_format(header):
+    """Return "ZIP" when the leading bytes start a zip archive, else None."""
+    return "ZIP" if bytes(header[:4]) in ZIP_SIGNATURES else None
+
+class UploadBufferPool:
+    """
+    Reusable bytearrays for reading uploads.
+
+    A released buffer is kept for the next request only when nothing still
+    references its memory; a memoryview left alive by a failed request makes
+    the buffer non-resizable, and such buffers are simply dropped.
+    """
+    def __init__(self, max_buffers=8):
+        self.max_buffers = max_buffers
+        self._free = []
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.allocated = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                self.reused += 1
+                return self._free.pop()
+        self.allocated += 1
+        return bytearray()
+
+    def release(self, buffer):
+        try:
+            # Fails with BufferError while any view of the buffer is alive
+            buffer.append(0)
+            del buffer[-1]
+        except BufferError:
+            return
+        with self._lock:
+            if len(self._free) < self.max_buffers:
+                self._free.append(buffer)
+
+    def stats(self):
+        return {
+            "free": len(self._free),
+            "max_buffers": self.max_buffers,
+            "allocated": self.allocated,
+            "reused": self.reused,
+        }
+
+async def read_upload(file, max_bytes, chunk_size=256 * 1024, buffer=None, sniff=sniff_image_format):
+    """
+    Read an UploadFile in ``chunk_size`` pieces into ``buffer`` and return a
+    memoryview of the payload.
+
+    By now Starlette has spooled the part, whose request as a whole
+    ``RequestSizeLimitMiddleware`` already bounded; here the part's size is
+    checked before copying and the leading bytes after the first chunk, so
+    oversize or non-image parts never reach the buffer. The buffer only
+    grows as far as the payload needs and never beyond ``max_bytes``.
+    ``sniff`` maps the header to a format name, or None to reject it.
+    """
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise UploadRejectedError(413, f"File {file.filename} exceeds {max_bytes} bytes")
+    if buffer is None:
+        buffer = bytearray()
+
+    length = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        if length == 0 and sniff(chunk) is None:
+            raise UploadRejectedError(415, f"File {file.filename} is not in a supported format")
+        end = length + len(chunk)
+        if end > max_bytes:
+            raise UploadRejectedError(413, f"File {file.filename} exceeds {max_bytes} bytes")
+        if end > len(buffer):
+            # Grow geometrically so a large upload costs few reallocations
+            buffer.extend(bytes(min(max(end, 2 * len(buffer)), max_bytes) - len(buffer)))
+        buffer[length:end] = chunk
+        length = end
+
+    if length == 0:
+        raise UploadRejectedError(400, f"File {file.filename} is empty")
+    return memoryview(buffer)[:length]
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware answering 413 for request bodies over ``max_bytes``
+    (``path_limits`` maps exact paths to their own limits).
+
+    ``read_upload`` only sees a part once Starlette has parsed and spooled
+    the whole multipart body, so this guard runs first: a declared
+    Content-Length over the limit is rejected before any byte is read, and
+    the body is counted as it streams in. Once it passes the limit, the app
+    sees the client disconnect and whatever it answers is replaced with 413.
+    """
+    def __init__(self, app, max_bytes, path_limits=None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        max_bytes = self.path_limits.get(scope["path"], self.max_bytes)
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+            await self._reject(send, max_bytes)
+            return
+
+        state = {"received": 0, "exceeded": False, "started": False}
+
+        async def limited_receive():
+            if state["exceeded"]:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+                if state["received"] > max_bytes:
+                    state["exceeded"] = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if state["exceeded"] and not state["started"]:
+                return  # replaced by the 413 below
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not state["exceeded"] or state["started"]:
+                raise
+        if state["exceeded"] and not state["started"]:
+            await self._reject(send, max_bytes)
+
+    @staticmethod
+    async def _reject(send, max_bytes):
+        body = json.dumps({"detail": f"Request body exceeds {max_bytes} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class ServiceOverloadedError(RuntimeError):
+    """Raised when the inference pool has no admission slots left."""
+    def __init__(self, retry_after=1):
+        super().__init__("Inference service is at capacity, retry later")
+        self.retry_after = retry_after
+
+class WorkerPool:
+    """
+    Bounded executor for the CPU-bound parts of a prediction.
+
+    ``kind="thread"`` runs decoding and inference on one thread pool.
+    ``kind="process"`` moves decoding to a process pool so PIL work scales
+    across cores; inference stays on threads because TensorFlow releases the
+    GIL and a model copy per process would multiply memory.
+
+    At most ``max_pending`` requests are admitted at a time; beyond that
+    ``admit`` fails fast with ServiceOverloadedError.
+    """
+    def __init__(self, kind="thread", workers=0, max_pending=64, retry_after=1):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.max_pending = max(1, int(max_pending))
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self.thread_executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="inference"
+        )
+        self.process_executor = None
+        if kind == "process":
+            # spawn avoids forking a process that already runs TensorFlow threads
+            self.process_executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    @contextmanager
+    def admit(self):
+        """Reserve an admission slot for the duration of one request."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServiceOverloadedError(self.retry_after)
+        self.pending += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+    async def run_cpu(self, fn, *args):
+        """Run decode-style work, in a process worker when configured."""
+        executor = self.process_executor or self.thread_executor
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def run_inference(self, fn, *args):
+        """Run model work on the inference thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.thread_executor, fn, *args)
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        """Stop all workers, waiting for running tasks to finish."""
+        self.thread_executor.shutdown(wait=True)
+        if self.process_executor is not None:
+            self.process_executor.shutdown(wait=True)
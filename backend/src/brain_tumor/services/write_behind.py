@@ -0,0 +1,138 @@
+import asyncio
+import logging
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from src.brain_tumor.services.batching import STOP, collect_batch
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+class WriteBehindQueue:
+    """
+    Buffer prediction documents in process and persist them with insert_many.
+
+    ``put`` assigns the ``_id`` client-side and returns it immediately, so
+    callers can respond before Mongo acknowledges the write. A batch is
+    flushed when it reaches ``max_batch_size`` or ``flush_interval_ms`` after
+    its first document arrived. The queue holds at most ``max_pending``
+    documents; beyond that ``put`` waits, which pushes back on producers.
+
+    Failed batches are retried ``max_retries`` times; duplicate-key errors on
+    a retry mean the document was already stored and count as success.
+    ``on_flush(db, documents)`` runs after each successful batch.
+    """
+    def __init__(self, db_provider, max_batch_size=100, flush_interval_ms=200.0,
+                 max_pending=10000, max_retries=3, on_flush=None):
+        self.db_provider = db_provider
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.max_pending = max(1, int(max_pending))
+        self.max_retries = max_retries
+        self.on_flush = on_flush
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._worker = asyncio.create_task(self._run())
+
+    async def put(self, document):
+        """Queue one document and return its ObjectId."""
+        return (await self.put_many([document]))[0]
+
+    async def put_many(self, documents):
+        """Queue documents in order and return their ObjectIds."""
+        self._ensure_worker()
+        ids = []
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            ids.append(document["_id"])
+            await self._queue.put(document)
+        return ids
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _drain_nowait(self):
+        batch = []
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is not STOP:
+                batch.append(item)
+        return batch
+
+    async def _run(self):
+        while True:
+            batch, stop = await collect_batch(self._queue, self.max_batch_size, self.flush_interval)
+            if batch:
+                await self._write(batch)
+            if stop:
+                return
+
+    async def _write(self, documents):
+        for attempt in range(self.max_retries + 1):
+            db = await self.db_provider()
+            try:
+                await db.predictions.insert_many(documents, ordered=False)
+                break
+            except BulkWriteError as e:
+                errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+                if not errors:
+                    break
+                error = errors[0].get("errmsg")
+            except Exception as e:
+                error = str(e)
+            logger.warning("Write-behind flush of %s documents failed (attempt %s): %s", len(documents), attempt + 1, error)
+            if attempt < self.max_retries:
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        else:
+            self.dropped += len(documents)
+            logger.error("Dropped %s prediction documents after %s attempts", len(documents), self.max_retries + 1)
+            return
+
+        self.flushed += len(documents)
+        self.batches += 1
+        if self.on_flush is not None:
+            try:
+                await self.on_flush(db, documents)
+            except Exception as e:
+                logger.error("Write-behind on_flush callback failed: %s", e)
+
+    async def flush(self):
+        """Write everything queued so far, in the caller's task."""
+        if self._queue is None:
+            return
+        while True:
+            batch = self._drain_nowait()
+            if not batch:
+                return
+            await self._write(batch)
+
+    async def close(self):
+        """Let the worker write everything queued so far, then stop it."""
+        if self._worker is not None and not self._worker.done():
+            await self._queue.put(STOP)
+            await self._worker
+        self._worker = None
+        await self.flush()
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
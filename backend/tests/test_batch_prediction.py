@@ -0,0 +1,73 @@
+"""Study uploads: archive limits and chunked batched inference."""
+import asyncio
+import io
+import zipfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.brain_tumor.routes import prediction as routes
+from src.brain_tumor.services.backends import InferenceBackend
+from src.brain_tumor.services.model_service import ModelService
+from src.brain_tumor.services.uploads import UploadRejectedError
+
+def png_bytes(value=0):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (value, value, value)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def zip_of(count):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i in range(count):
+            archive.writestr(f"slice_{i:03d}.png", png_bytes(i))
+        archive.writestr("notes.txt", b"not an image")
+    return memoryview(buffer.getvalue())
+
+def test_archive_images_are_extracted_in_name_order():
+    slices = routes.extract_archive_images(zip_of(3), max_bytes=1 << 20, max_files=10)
+    assert [name for name, _ in slices] == ["slice_000.png", "slice_001.png", "slice_002.png"]
+
+def test_too_many_archive_members_are_rejected_before_decompressing(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("a member was decompressed")
+
+    monkeypatch.setattr(zipfile.ZipFile, "read", refuse)
+    with pytest.raises(UploadRejectedError) as raised:
+        routes.extract_archive_images(zip_of(5), max_bytes=1 << 20, max_files=4)
+    assert raised.value.status_code == 413
+
+def test_archive_expanding_beyond_the_limit_is_rejected():
+    with pytest.raises(ValueError):
+        routes.extract_archive_images(zip_of(3), max_bytes=10, max_files=10)
+
+class RecordingBackend(InferenceBackend):
+    name = "recording"
+
+    def __init__(self):
+        super().__init__("memory")
+        self.batch_sizes = []
+
+    def predict(self, img_batch):
+        self.batch_sizes.append(len(img_batch))
+        # Class 0 for dark images, class 2 for bright ones
+        bright = img_batch.mean(axis=(1, 2, 3)) > 0.5
+        return np.where(bright[:, None], [[0.1, 0.1, 0.7, 0.1]], [[0.7, 0.1, 0.1, 0.1]]).astype(np.float32)
+
+def test_study_inference_runs_in_batch_sized_chunks(monkeypatch):
+    monkeypatch.setattr("src.brain_tumor.services.model_service.settings.BATCH_MAX_SIZE", 4)
+    service = ModelService(model_path="memory")
+    service.model = RecordingBackend()
+    images = [png_bytes(255 if i % 2 else 0) for i in range(10)] + [b"not an image"]
+
+    async def scenario():
+        try:
+            return await service.predict_images(images)
+        finally:
+            await service.close()
+
+    results = asyncio.run(scenario())
+    assert service.model.batch_sizes == [4, 4, 2]
+    assert [r["prediction"] for r in results[:4]] == ["glioma", "notumor", "glioma", "notumor"]
+    assert isinstance(results[-1], BaseException)
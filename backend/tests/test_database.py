@@ -0,0 +1,25 @@
+"""Database lifecycle: startup must not wait on an unreachable MongoDB."""
+import asyncio
+import time
+
+from src.brain_tumor import database
+
+def test_startup_does_not_wait_for_index_bootstrap(monkeypatch):
+    monkeypatch.setattr(database.settings, "MONGODB_URL", "mongodb://127.0.0.1:9")
+    monkeypatch.setattr(database.settings, "MONGO_ENSURE_INDEXES", True)
+    monkeypatch.setattr(database, "client", None)
+
+    async def scenario():
+        started = time.perf_counter()
+        await database.connect_to_database()
+        connect_seconds = time.perf_counter() - started
+        task = database.index_task
+        pending = task is not None and not task.done()
+        await database.close_db_connection()
+        return connect_seconds, pending, task.cancelled()
+
+    connect_seconds, pending, cancelled = asyncio.run(scenario())
+    assert connect_seconds < 1.0
+    assert pending
+    assert cancelled
+    assert database.client is None and database.index_task is None
@@ -0,0 +1,85 @@
+"""Grad-CAM requests: unavailable explanations and reuse of the explained pass under TTA."""
+import asyncio
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.brain_tumor.services.backends import InferenceBackend
+from src.brain_tumor.services.explanations import ExplanationUnavailableError
+from src.brain_tumor.services.model_service import ModelService
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (40, 80, 120)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class ExplainingBackend(InferenceBackend):
+    """Scores the original image as class 0 and any flipped view as class 1."""
+    name = "explaining"
+    supports_explanations = True
+
+    def __init__(self, error=None):
+        super().__init__("memory")
+        self.error = error
+        self.predicted = 0
+        self.explained = 0
+
+    def predict(self, img_batch):
+        self.predicted += len(img_batch)
+        return np.tile(np.array([[0.2, 0.6, 0.1, 0.1]], dtype=np.float32), (len(img_batch), 1))
+
+    def explain(self, img_batch):
+        if self.error is not None:
+            raise self.error
+        self.explained += len(img_batch)
+        probabilities = np.tile(np.array([[0.6, 0.2, 0.1, 0.1]], dtype=np.float32), (len(img_batch), 1))
+        return probabilities, np.zeros((len(img_batch), 7, 7), dtype=np.float32)
+
+def run(service, scenario):
+    async def wrapped():
+        try:
+            return await scenario()
+        finally:
+            await service.close()
+    return asyncio.run(wrapped())
+
+def test_unavailable_explanation_is_not_wrapped():
+    service = ModelService(model_path="memory")
+    service.model = ExplainingBackend(ExplanationUnavailableError("No convolutional layer to explain"))
+
+    with pytest.raises(ExplanationUnavailableError):
+        run(service, lambda: service.explain_image(png_bytes()))
+
+def test_tta_reuses_the_explained_original_view():
+    service = ModelService(model_path="memory")
+    service.model = ExplainingBackend()
+    image = png_bytes()
+
+    async def scenario():
+        result, heatmap = await service.explain_image(image)
+        tta = await service.predict_image_tta(image, ["original", "hflip"], explained=result)
+        return result, heatmap, tta
+
+    result, heatmap, tta = run(service, scenario)
+    assert heatmap is not None
+    assert service.model.explained == 1
+    # Only the flipped view needs a forward pass
+    assert service.model.predicted == 1
+    assert tta["ensemble"]["passes"] == 2
+    assert tta["class_probabilities"]["glioma"] == pytest.approx(0.4)
+    assert tta["class_probabilities"]["meningioma"] == pytest.approx(0.4)
+
+def test_tta_with_only_the_original_view_runs_no_further_pass():
+    service = ModelService(model_path="memory")
+    service.model = ExplainingBackend()
+    image = png_bytes()
+
+    async def scenario():
+        result, _ = await service.explain_image(image)
+        return result, await service.predict_image_tta(image, ["original"], explained=result)
+
+    result, tta = run(service, scenario)
+    assert service.model.predicted == 0
+    assert tta["class_probabilities"] == pytest.approx(result["class_probabilities"])
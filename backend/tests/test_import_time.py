@@ -0,0 +1,89 @@
+"""
+Startup budget of the API process.
+
+Importing the app must not load an inference runtime, must work without
+TensorFlow installed, and must stay within a time and memory budget. Each
+check runs in a fresh interpreter so earlier imports cannot hide the cost.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Well above what the app needs (about 1 s and 70 MB) yet far below the
+# several seconds and hundreds of MB that importing TensorFlow costs
+IMPORT_SECONDS_BUDGET = 3.0
+IMPORT_RSS_MB_BUDGET = 250
+
+INFERENCE_RUNTIMES = ("tensorflow", "keras", "onnxruntime", "tflite_runtime", "ai_edge_litert")
+
+# Makes the child behave as if TensorFlow and Keras were not installed
+BLOCK_TENSORFLOW = """
+import importlib.abc, sys
+class BlockTensorFlow(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in ("tensorflow", "keras"):
+            raise ImportError(f"No module named '{name}'")
+sys.meta_path.insert(0, BlockTensorFlow())
+"""
+
+IMPORT_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import src.brain_tumor.main
+seconds = time.perf_counter() - started
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "seconds": seconds,
+    "max_rss_mb": max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    "runtimes": [name for name in %r if name in sys.modules],
+}))
+""" % (INFERENCE_RUNTIMES,)
+
+HEALTH_PROBE = """
+import json
+from fastapi.testclient import TestClient
+from src.brain_tumor.main import app
+with TestClient(app) as client:
+    response = client.get("/health")
+print(json.dumps({"status_code": response.status_code, "body": response.json()}))
+"""
+
+def run_child(code, **env):
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+@pytest.fixture(scope="module")
+def import_profile():
+    return run_child(IMPORT_PROBE)
+
+def test_import_loads_no_inference_runtime(import_profile):
+    assert import_profile["runtimes"] == []
+
+def test_import_time_within_budget(import_profile):
+    assert import_profile["seconds"] < IMPORT_SECONDS_BUDGET
+
+def test_import_memory_within_budget(import_profile):
+    assert import_profile["max_rss_mb"] < IMPORT_RSS_MB_BUDGET
+
+def test_import_without_tensorflow():
+    assert run_child(BLOCK_TENSORFLOW + IMPORT_PROBE)["runtimes"] == []
+
+def test_health_without_tensorflow():
+    # Motor connects lazily, so no MongoDB server is needed when indexes are not created
+    result = run_child(BLOCK_TENSORFLOW + HEALTH_PROBE, WARMUP_ON_STARTUP="False", MONGO_ENSURE_INDEXES="False")
+    assert result["status_code"] == 200
+    assert result["body"] == {"status": "healthy", "model_loaded": False}
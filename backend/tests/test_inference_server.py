@@ -0,0 +1,88 @@
+"""Inference server round trips and connection authentication, on a stub backend."""
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from src.brain_tumor.services.backends import InferenceBackend
+from src.brain_tumor.services.inference_server import InferenceServer, RemoteBackend
+
+class DoublingBackend(InferenceBackend):
+    name = "stub"
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def load(self):
+        pass
+
+    def predict(self, img_batch):
+        self.started.set()
+        self.release.wait(5)
+        return img_batch.reshape(len(img_batch), -1) * 2
+
+@pytest.fixture
+def server(tmp_path):
+    server = InferenceServer(str(tmp_path / "inference.sock"), authkey="secret")
+    server._backends[("model", "stub")] = DoublingBackend("model")
+    listener = server.listen()
+    threading.Thread(target=server.serve_forever, args=(listener,), daemon=True).start()
+    yield server
+    listener.close()
+
+def test_remote_predict_round_trip(server):
+    backend = RemoteBackend(server.address, "model", "stub", authkey="secret")
+    backend.load()
+    batch = np.arange(12, dtype=np.float32).reshape(2, 2, 3)
+    np.testing.assert_array_equal(backend.predict(batch), batch.reshape(2, -1) * 2)
+    backend.close()
+
+def test_close_also_closes_channels_in_use(server):
+    served = server._backends[("model", "stub")]
+    backend = RemoteBackend(server.address, "model", "stub", authkey="secret")
+    opened = []
+    open_channel = backend._open_channel
+
+    def tracked_open_channel():
+        opened.append(open_channel())
+        return opened[-1]
+
+    backend._open_channel = tracked_open_channel
+    backend.load()
+
+    served.release.clear()
+    call = threading.Thread(target=backend.predict, args=(np.ones((1, 2), dtype=np.float32),))
+    call.start()
+    assert served.started.wait(5)
+    backend.close()  # the call still holds its channel
+    served.release.set()
+    call.join(5)
+
+    assert len(opened) == 1
+    assert opened[0].conn.closed
+    assert backend._channels.empty()
+
+def test_wrong_authkey_is_rejected(server):
+    backend = RemoteBackend(server.address, "model", "stub", authkey="guess")
+    with pytest.raises(RuntimeError):
+        backend.load()
+
+def test_missing_authkey_is_refused_before_connecting(server):
+    with pytest.raises(RuntimeError):
+        RemoteBackend(server.address, "model", "stub").load()
+
+def test_silent_client_does_not_block_others(server):
+    with socket.socket(socket.AF_UNIX) as silent:
+        silent.connect(server.address)
+        backend = RemoteBackend(server.address, "model", "stub", authkey="secret")
+        backend.load()
+        assert backend.predict(np.ones((1, 2), dtype=np.float32)).tolist() == [[2.0, 2.0]]
+        backend.close()
+
+def test_server_requires_an_authkey(tmp_path):
+    with pytest.raises(ValueError):
+        InferenceServer(str(tmp_path / "inference.sock"), authkey="")
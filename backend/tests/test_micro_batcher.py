@@ -0,0 +1,122 @@
+"""MicroBatcher: coalescing, wait-based flushes, error fan-out and draining on close."""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from src.brain_tumor.services.model_service import MicroBatcher
+
+class RecordingModel:
+    """predict_fn that returns each image's value as its output row."""
+    def __init__(self, error=None):
+        self.batch_sizes = []
+        self.error = error
+
+    def __call__(self, inputs):
+        self.batch_sizes.append(len(inputs))
+        if self.error is not None:
+            raise self.error
+        return np.concatenate(inputs, axis=0)
+
+def image(value):
+    return np.full((1, 2), value, dtype=np.float32)
+
+def test_concurrent_requests_coalesce_up_to_max_batch_size():
+    model = RecordingModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=50)
+        outputs = await asyncio.gather(*[batcher.submit(image(i)) for i in range(10)])
+        await batcher.close()
+        return outputs
+
+    outputs = asyncio.run(scenario())
+    assert model.batch_sizes == [4, 4, 2]
+    assert [float(output[0, 0]) for output in outputs] == list(range(10))
+    assert all(output.shape == (1, 2) for output in outputs)
+
+def test_partial_batch_is_flushed_after_max_wait():
+    model = RecordingModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=16, max_wait_ms=30)
+        started = time.perf_counter()
+        output = await batcher.submit(image(7))
+        waited = time.perf_counter() - started
+        await batcher.close()
+        return output, waited, batcher.metrics.snapshot()
+
+    output, waited, metrics = asyncio.run(scenario())
+    assert float(output[0, 0]) == 7
+    assert model.batch_sizes == [1]
+    assert 0.025 <= waited < 1.0
+    assert metrics["batches"] == 1 and metrics["items"] == 1
+
+def test_zero_wait_dispatches_without_waiting_for_more():
+    model = RecordingModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=16, max_wait_ms=0)
+        started = time.perf_counter()
+        await batcher.submit(image(1))
+        waited = time.perf_counter() - started
+        await batcher.close()
+        return waited
+
+    assert asyncio.run(scenario()) < 0.5
+    assert model.batch_sizes == [1]
+
+def test_batch_failure_reaches_every_request_in_it():
+    model = RecordingModel(error=ValueError("model exploded"))
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(*[batcher.submit(image(i)) for i in range(3)], return_exceptions=True)
+        # The worker survives a failed batch
+        model.error = None
+        after = await batcher.submit(image(5))
+        await batcher.close()
+        return results, after
+
+    results, after = asyncio.run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(result, ValueError) for result in results)
+    assert float(after[0, 0]) == 5
+
+def test_close_drains_queued_requests_then_stops():
+    model = RecordingModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=2, max_wait_ms=1000)
+        tasks = [asyncio.create_task(batcher.submit(image(i))) for i in range(5)]
+        await asyncio.sleep(0)  # let every request queue
+        await batcher.close()
+        assert all(task.done() for task in tasks)
+        return [float(task.result()[0, 0]) for task in tasks], batcher
+
+    values, batcher = asyncio.run(scenario())
+    assert values == [0, 1, 2, 3, 4]
+    # The stop sentinel cuts the wait short instead of holding the last item for max_wait
+    assert model.batch_sizes == [2, 2, 1]
+    assert batcher._worker is None and batcher.pending == 0
+
+def test_cancelled_requests_are_dropped_from_the_batch():
+    model = RecordingModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=30)
+        abandoned = asyncio.create_task(batcher.submit(image(0)))
+        kept = asyncio.create_task(batcher.submit(image(1)))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        output = await kept
+        await batcher.close()
+        return output
+
+    assert float(asyncio.run(scenario())[0, 0]) == 1
+    assert model.batch_sizes == [1]
+
+@pytest.mark.parametrize("size", [0, -3])
+def test_batch_size_is_at_least_one(size):
+    assert MicroBatcher(RecordingModel(), max_batch_size=size).max_batch_size == 1
@@ -0,0 +1,81 @@
+"""Routing weights of the model registry and the guard on model management."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.brain_tumor.routes import prediction as routes
+from src.brain_tumor.services.model_registry import ModelRegistry, UnknownModelVersionError
+
+def make_registry(*versions):
+    registry = ModelRegistry(default_version=versions[0], pool=None)
+    for version in versions:
+        registry.add(SimpleNamespace(model_version=version))
+    return registry
+
+def test_unweighted_default_takes_the_remaining_percent():
+    registry = make_registry("v1", "v2")
+    registry.set_routing(weights={"v2": 10})
+    assert registry.traffic_shares() == pytest.approx({"v2": 0.1, "v1": 0.9})
+
+def test_weighted_default_makes_weights_relative():
+    registry = make_registry("v1", "v2")
+    registry.set_routing(weights={"v1": 3, "v2": 1})
+    assert registry.traffic_shares() == pytest.approx({"v1": 0.75, "v2": 0.25})
+
+def test_no_weights_routes_to_the_default():
+    registry = make_registry("v1", "v2")
+    assert registry.traffic_shares() == {}
+    assert all(registry.route().model_version == "v1" for _ in range(20))
+
+def test_canary_at_full_percent_takes_all_traffic():
+    registry = make_registry("v1", "v2")
+    registry.set_routing(weights={"v2": 100})
+    assert all(registry.route().model_version == "v2" for _ in range(20))
+
+@pytest.mark.parametrize("weights, error", [
+    ({"v2": 101}, ValueError),
+    ({"v2": -1}, ValueError),
+    ({"v1": 0, "v2": 0}, ValueError),
+    ({"v3": 10}, UnknownModelVersionError),
+])
+def test_invalid_weights_are_rejected(weights, error):
+    registry = make_registry("v1", "v2")
+    with pytest.raises(error):
+        registry.set_routing(weights=weights)
+    assert registry.weights == {}
+
+def test_deploy_rejects_a_weight_before_loading():
+    registry = make_registry("v1")
+    with pytest.raises(ValueError):
+        asyncio.run(registry.deploy("v2", "model.h5", weight=150))
+    assert not registry.is_deploying("v2")
+
+def test_default_version_change_is_checked_against_weights():
+    registry = make_registry("v1", "v2")
+    registry.set_routing(weights={"v2": 10}, default_version="v2")
+    assert registry.traffic_shares() == pytest.approx({"v2": 1.0})
+
+def test_model_management_is_disabled_without_a_token(monkeypatch):
+    monkeypatch.setattr(routes.settings, "ADMIN_TOKEN", "")
+    with pytest.raises(HTTPException) as raised:
+        routes.require_admin("anything")
+    assert raised.value.status_code == 403
+
+def test_model_management_needs_the_token(monkeypatch):
+    monkeypatch.setattr(routes.settings, "ADMIN_TOKEN", "secret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as raised:
+            routes.require_admin(token)
+        assert raised.value.status_code == 401
+    routes.require_admin("secret")
+
+def test_model_files_must_be_inside_the_models_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(routes.settings, "MODELS_DIR", str(tmp_path))
+    routes.check_model_file(str(tmp_path / "v2.h5"))
+    routes.check_model_file(None)
+    for path in ("/etc/passwd", str(tmp_path / ".." / "outside.h5")):
+        with pytest.raises(HTTPException) as raised:
+            routes.check_model_file(path)
+        assert raised.value.status_code == 400
@@ -0,0 +1,102 @@
+"""PredictionCache: TTL expiry, LRU eviction, per-version keys and the Mongo tier."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from src.brain_tumor.services import prediction_cache as cache_module
+from src.brain_tumor.services.prediction_cache import PredictionCache
+
+IMAGE = PredictionCache.hash_bytes(b"slice-1")
+OTHER = PredictionCache.hash_bytes(b"slice-2")
+
+def result(prediction):
+    return {"prediction": prediction, "confidence": 0.9}
+
+def get(cache, image_hash, db=None, model_version=None):
+    return asyncio.run(cache.get(image_hash, db, model_version))
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test advances by hand, seen only by the cache module."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+def test_hash_is_content_addressed():
+    assert PredictionCache.hash_bytes(b"slice-1") == IMAGE
+    assert PredictionCache.hash_bytes(memoryview(b"slice-1")) == IMAGE
+    assert IMAGE != OTHER
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache("v1", ttl_seconds=60, use_mongo=False)
+    cache.put(IMAGE, result("glioma"), "id-1")
+    clock.now += 59
+    assert get(cache, IMAGE) == {"result": result("glioma"), "_id": "id-1"}
+    clock.now += 2
+    assert get(cache, IMAGE) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_least_recently_used_entry_is_evicted_at_capacity():
+    cache = PredictionCache("v1", max_entries=2, use_mongo=False)
+    third = PredictionCache.hash_bytes(b"slice-3")
+    cache.put(IMAGE, result("glioma"))
+    cache.put(OTHER, result("notumor"))
+    assert get(cache, IMAGE) is not None  # now the most recently used
+    cache.put(third, result("pituitary"))
+
+    assert get(cache, OTHER) is None
+    assert get(cache, IMAGE)["result"] == result("glioma")
+    assert get(cache, third)["result"] == result("pituitary")
+    assert cache.stats()["entries"] == 2
+
+def test_keys_are_scoped_by_model_version():
+    cache = PredictionCache("v1", use_mongo=False)
+    cache.put(IMAGE, result("glioma"))
+    cache.put(IMAGE, result("notumor"), model_version="v2")
+
+    assert get(cache, IMAGE)["result"] == result("glioma")
+    assert get(cache, IMAGE, model_version="v1")["result"] == result("glioma")
+    assert get(cache, IMAGE, model_version="v2")["result"] == result("notumor")
+    assert get(cache, IMAGE, model_version="v3") is None
+
+    cache.clear("v2")
+    assert get(cache, IMAGE, model_version="v2") is None
+    assert get(cache, IMAGE)["result"] == result("glioma")
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["test_prediction_cache"]
+
+def store(db, image_hash, model_version, full_result):
+    document = {"_id": ObjectId(), "image_hash": image_hash, "model_version": model_version,
+                "full_result": full_result}
+    asyncio.run(db.predictions.insert_one(document))
+    return str(document["_id"])
+
+def test_mongo_tier_fills_the_memory_tier(db):
+    stored_id = store(db, IMAGE, "v1", result("meningioma"))
+    cache = PredictionCache("v1")
+
+    assert get(cache, IMAGE, db) == {"result": result("meningioma"), "_id": stored_id}
+    # Served from memory now, even without the database
+    assert get(cache, IMAGE) == {"result": result("meningioma"), "_id": stored_id}
+    stats = cache.stats()
+    assert stats["mongo_hits"] == 1 and stats["memory_hits"] == 1 and stats["misses"] == 0
+
+def test_mongo_tier_matches_the_model_version(db):
+    store(db, IMAGE, "v1", result("meningioma"))
+    cache = PredictionCache("v1")
+    assert get(cache, IMAGE, db, model_version="v2") is None
+    assert cache.stats()["misses"] == 1
+
+def test_mongo_tier_skips_augmented_results(db):
+    store(db, IMAGE, "v1", {**result("glioma"), "ensemble": {"passes": 2}})
+    assert get(PredictionCache("v1"), IMAGE, db) is None
+
+def test_mongo_tier_can_be_disabled(db):
+    store(db, IMAGE, "v1", result("meningioma"))
+    assert get(PredictionCache("v1", use_mongo=False), IMAGE, db) is None
@@ -0,0 +1,116 @@
+"""Keyset pagination of the prediction history: cursors, filters and ties."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from src.brain_tumor.database import get_database
+from src.brain_tumor.main import app
+from src.brain_tumor.services.prediction_history import (
+    InvalidCursorError, build_history_query, decode_cursor, encode_cursor
+)
+
+BASE_DATE = datetime(2026, 3, 1, 12, 0, 0)
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "prediction_date": datetime(2026, 3, 1, 12, 30, 15, 123000)}
+    cursor = encode_cursor(doc)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (doc["prediction_date"], doc["_id"])
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    "bm8tc2VwYXJhdG9y",  # "no-separator"
+    encode_cursor({"_id": "zz", "prediction_date": BASE_DATE}),  # not an ObjectId
+    "bm90LWEtZGF0ZXw2NWYwMDAwMDAwMDAwMDAwMDAwMDAwMDA",  # "not-a-date|..."
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+def test_no_filters_match_everything():
+    assert build_history_query() == {}
+
+def test_single_filter_is_not_wrapped():
+    assert build_history_query(prediction="glioma") == {"prediction": "glioma"}
+
+def test_date_range_bounds():
+    start, end = BASE_DATE, BASE_DATE + timedelta(days=1)
+    assert build_history_query(start_date=start) == {"prediction_date": {"$gte": start}}
+    assert build_history_query(end_date=end) == {"prediction_date": {"$lt": end}}
+    assert build_history_query(start_date=start, end_date=end) == {
+        "prediction_date": {"$gte": start, "$lt": end}
+    }
+
+def test_filters_and_cursor_combine():
+    last = {"_id": ObjectId(), "prediction_date": BASE_DATE}
+    query = build_history_query("notumor", BASE_DATE - timedelta(days=1), None, encode_cursor(last))
+    assert query == {"$and": [
+        {"prediction": "notumor"},
+        {"prediction_date": {"$gte": BASE_DATE - timedelta(days=1)}},
+        {"$or": [
+            {"prediction_date": {"$lt": BASE_DATE}},
+            {"prediction_date": BASE_DATE, "_id": {"$lt": last["_id"]}},
+        ]},
+    ]}
+
+@pytest.fixture
+def client():
+    db = AsyncMongoMockClient()["test_history"]
+    app.dependency_overrides[get_database] = lambda: db
+    try:
+        yield TestClient(app), db
+    finally:
+        app.dependency_overrides.pop(get_database, None)
+
+def make_docs(dates, prediction="glioma"):
+    return [{"_id": ObjectId(), "image_name": f"{prediction}_{i}.jpg", "prediction": prediction,
+             "confidence": 0.9, "prediction_date": date} for i, date in enumerate(dates)]
+
+def read_all_pages(http, limit, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = {"limit": limit, **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = http.get("/api/v1/predictions/", params=query)
+        assert response.status_code == 200
+        ids.extend(item["_id"] for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids, pages
+
+def test_pages_cover_ties_on_prediction_date_exactly_once(client):
+    http, db = client
+    # Five predictions in the same millisecond, two older ones
+    docs = make_docs([BASE_DATE] * 5 + [BASE_DATE - timedelta(seconds=1)] * 2)
+    asyncio.run(db.predictions.insert_many(docs))
+
+    ids, pages = read_all_pages(http, limit=2)
+    expected = [str(doc["_id"]) for doc in sorted(docs, key=lambda d: (d["prediction_date"], d["_id"]), reverse=True)]
+    assert ids == expected
+    assert pages == 4
+
+def test_filtered_pages(client):
+    http, db = client
+    glioma = make_docs([BASE_DATE - timedelta(hours=h) for h in range(4)], "glioma")
+    notumor = make_docs([BASE_DATE - timedelta(hours=h) for h in range(3)], "notumor")
+    asyncio.run(db.predictions.insert_many(glioma + notumor))
+
+    ids, _ = read_all_pages(http, limit=2, prediction="notumor")
+    assert ids == [str(doc["_id"]) for doc in notumor]
+
+    window = {"start_date": (BASE_DATE - timedelta(hours=2)).isoformat(), "end_date": BASE_DATE.isoformat()}
+    ids, _ = read_all_pages(http, limit=10, prediction="glioma", **window)
+    assert ids == [str(doc["_id"]) for doc in glioma[1:3]]
+
+def test_invalid_cursor_is_a_client_error(client):
+    http, _ = client
+    for format in ("json", "ndjson"):
+        response = http.get("/api/v1/predictions/", params={"cursor": "garbage!", "format": format})
+        assert response.status_code == 400
+        assert "Invalid cursor" in response.json()["detail"]
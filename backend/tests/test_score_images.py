@@ -0,0 +1,55 @@
+"""Offline scoring CLI: --batch-size sets the forward pass size."""
+import argparse
+import asyncio
+import csv
+import io
+
+import numpy as np
+from PIL import Image
+
+from scripts import score_images
+from src.brain_tumor.services.backends import InferenceBackend
+from src.brain_tumor.services.model_service import ModelService
+
+class RecordingBackend(InferenceBackend):
+    name = "recording"
+
+    def __init__(self):
+        super().__init__("memory")
+        self.batch_sizes = []
+
+    def predict(self, img_batch):
+        self.batch_sizes.append(len(img_batch))
+        return np.tile(np.array([[0.7, 0.1, 0.1, 0.1]], dtype=np.float32), (len(img_batch), 1))
+
+def write_images(directory, count):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (90, 90, 90)).save(buffer, format="PNG")
+    for i in range(count):
+        (directory / f"slice_{i:03d}.png").write_bytes(buffer.getvalue())
+
+def test_batch_size_reaches_the_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.brain_tumor.services.model_service.settings.BATCH_MAX_SIZE", 16)
+    backend = RecordingBackend()
+
+    async def load_model(self):
+        self.model = backend
+        return backend
+
+    monkeypatch.setattr(ModelService, "load_model", load_model)
+    images = tmp_path / "images"
+    images.mkdir()
+    write_images(images, 40)
+    output = tmp_path / "scores.csv"
+    args = argparse.Namespace(
+        input_dir=str(images), manifest=None, output=str(output), mongo=False, checkpoint=None,
+        model_path="memory", model_version="test", classes_path="missing.json", backend="recording",
+        batch_size=40, prefetch=1, executor="thread", decode_workers=2, flush_every=1024,
+        progress_interval=60.0, limit=None,
+    )
+
+    asyncio.run(score_images.run(args))
+
+    assert backend.batch_sizes == [40]
+    with open(output, newline="") as f:
+        assert len(list(csv.DictReader(f))) == 40
@@ -0,0 +1,80 @@
+"""Prediction counters: creating missing totals and tolerating counter failures."""
+import asyncio
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from src.brain_tumor.routes import prediction as routes
+from src.brain_tumor.services import stats_service as stats_module
+from src.brain_tumor.services.stats_service import STATS_COLLECTION, TOTALS_ID, StatsService
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["test_stats"]
+
+async def count_incrementally(db, class_name):
+    """What StatsService.record does to the totals for one prediction."""
+    await db[STATS_COLLECTION].update_one(
+        {"_id": TOTALS_ID}, {"$inc": {"total": 1, f"by_class.{class_name}": 1}}, upsert=True
+    )
+
+@pytest.fixture
+def no_rebuild(monkeypatch):
+    """Fail if anything in the API process runs the full rebuild."""
+    async def refuse(db, indexes=()):
+        raise AssertionError("the API rebuilt prediction_stats")
+
+    monkeypatch.setattr(stats_module, "rebuild_stats", refuse)
+
+def test_empty_counters_on_a_new_deployment_are_complete(db, no_rebuild):
+    async def scenario():
+        service = StatsService(ttl_seconds=0)
+        assert await service.ensure_totals(db)
+        await count_incrementally(db, "notumor")
+        assert await service.ensure_totals(db)
+        return await service.get_statistics(db), await db[STATS_COLLECTION].find_one({"_id": TOTALS_ID})
+
+    stats, totals = asyncio.run(scenario())
+    assert stats["total_predictions"] == 1 and stats["no_tumor"] == 1
+    assert "rebuilt_at" in totals
+
+def test_counters_from_before_the_upgrade_are_left_for_the_script(db, no_rebuild, caplog):
+    async def scenario():
+        await db.predictions.insert_many([{"prediction": "glioma"} for _ in range(5)])
+        service = StatsService(ttl_seconds=0)
+        # Only the prediction stored since the upgrade was counted incrementally
+        await count_incrementally(db, "glioma")
+        assert not await service.ensure_totals(db)
+        return await service.get_statistics(db), await db[STATS_COLLECTION].find_one({"_id": TOTALS_ID})
+
+    stats, totals = asyncio.run(scenario())
+    assert stats["total_predictions"] == 1
+    assert "rebuilt_at" not in totals
+    assert "scripts.rebuild_stats" in caplog.text
+
+def test_missing_totals_are_created_without_touching_predictions_counts(db, no_rebuild):
+    async def scenario():
+        await db.predictions.insert_one({"prediction": "glioma"})
+        service = StatsService(ttl_seconds=0)
+        # Every worker runs the check at startup
+        await asyncio.gather(*[service.ensure_totals(db) for _ in range(3)])
+        return await db[STATS_COLLECTION].find_one({"_id": TOTALS_ID})
+
+    totals = asyncio.run(scenario())
+    assert totals["total"] == 0 and totals["by_class"] == {}
+
+def test_missing_totals_serve_zeros(db, no_rebuild):
+    async def scenario():
+        service = StatsService(ttl_seconds=0)
+        return [await service.get_statistics(db) for _ in range(2)]
+
+    for stats in asyncio.run(scenario()):
+        assert stats["total_predictions"] == 0 and stats["tumor_types"] == {}
+
+def test_counter_failure_does_not_fail_a_stored_prediction(monkeypatch):
+    async def failing_record(db, predictions):
+        raise RuntimeError("prediction_stats is unavailable")
+
+    monkeypatch.setattr(routes.stats_service, "record", failing_record)
+    asyncio.run(routes.record_stats(None, [{"prediction": "glioma", "prediction_date": datetime.utcnow()}]))
@@ -0,0 +1,166 @@
+"""Bounded upload reads, the buffer pool and the request size guard."""
+import asyncio
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from PIL import Image
+
+from src.brain_tumor.database import get_database
+from src.brain_tumor.main import app as api
+from src.brain_tumor.routes import prediction as routes
+from src.brain_tumor.services.backends import InferenceBackend
+from src.brain_tumor.services.model_service import ModelService
+from src.brain_tumor.services.uploads import (
+    RequestSizeLimitMiddleware, UploadBufferPool, UploadRejectedError, read_upload
+)
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+class FakeUpload:
+    """Just enough of UploadFile for read_upload: a filename, an optional size and read(n)."""
+    def __init__(self, data, size=None, filename="scan.png"):
+        self.data = data
+        self.size = size
+        self.filename = filename
+        self.position = 0
+        self.reads = 0
+
+    async def read(self, n):
+        self.reads += 1
+        chunk = self.data[self.position:self.position + n]
+        self.position += len(chunk)
+        return chunk
+
+def read(upload, max_bytes, **kwargs):
+    return asyncio.run(read_upload(upload, max_bytes, **kwargs))
+
+def rejection(upload, max_bytes, **kwargs):
+    with pytest.raises(UploadRejectedError) as info:
+        read(upload, max_bytes, **kwargs)
+    return info.value
+
+def test_payload_is_read_in_chunks_into_the_buffer():
+    data = PNG + bytes(range(200))
+    buffer = bytearray()
+    view = read(FakeUpload(data), 1024, chunk_size=64, buffer=buffer)
+    assert bytes(view) == data
+    assert view.obj is buffer
+
+def test_declared_size_over_the_limit_is_rejected_before_reading():
+    upload = FakeUpload(PNG, size=2048)
+    error = rejection(upload, 1024)
+    assert error.status_code == 413
+    assert upload.reads == 0
+
+def test_undeclared_oversize_payload_is_rejected_while_reading():
+    error = rejection(FakeUpload(PNG + bytes(2048)), 1024, chunk_size=256)
+    assert error.status_code == 413
+
+def test_unknown_leading_bytes_are_unsupported():
+    upload = FakeUpload(b"%PDF-1.7" + bytes(4096))
+    error = rejection(upload, 1024 * 1024, chunk_size=64)
+    assert error.status_code == 415
+    assert upload.reads == 1
+
+def test_empty_upload_is_a_client_error():
+    error = rejection(FakeUpload(b""), 1024)
+    assert error.status_code == 400
+    assert "empty" in error.detail
+
+class UnusedBackend(InferenceBackend):
+    name = "unused"
+
+    def predict(self, img_batch):
+        raise AssertionError("an undecodable upload reached the model")
+
+def truncated_png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (10, 20, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()[:60]
+
+@pytest.mark.parametrize("data", [PNG + b"garbage" * 64, truncated_png()], ids=["corrupt", "truncated"])
+@pytest.mark.parametrize("path", ["/api/v1/predict/", "/api/v1/predict/report/"])
+def test_undecodable_image_is_a_client_error(data, path):
+    service = ModelService(model_path="memory")
+    service.model = UnusedBackend("memory")
+    api.dependency_overrides[get_database] = lambda: AsyncMongoMockClient()["test_uploads"]
+    api.dependency_overrides[routes.select_model] = lambda: service
+    try:
+        response = TestClient(api).post(path, files={"file": ("scan.png", data, "image/png")})
+    finally:
+        api.dependency_overrides.pop(get_database, None)
+        api.dependency_overrides.pop(routes.select_model, None)
+        asyncio.run(service.close())
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Image data is corrupt or not a supported image"
+
+def test_buffer_growth_is_capped_at_max_bytes():
+    buffer = bytearray()
+    # Doubling from 600 would ask for 1200 bytes; the payload may never exceed 1000
+    view = read(FakeUpload(PNG + bytes(992)), 1000, chunk_size=600, buffer=buffer)
+    assert len(view) == 1000
+    assert len(buffer) == 1000
+
+def test_released_buffers_are_reused():
+    pool = UploadBufferPool(max_buffers=1)
+    buffer = pool.acquire()
+    pool.release(buffer)
+    assert pool.acquire() is buffer
+    assert pool.stats()["reused"] == 1
+
+def test_buffers_with_live_views_are_dropped_on_release():
+    pool = UploadBufferPool()
+    buffer = pool.acquire()
+    buffer.extend(b"payload")
+    view = memoryview(buffer)[:3]
+    pool.release(buffer)
+    assert pool.stats()["free"] == 0
+    assert pool.acquire() is not buffer
+    view.release()
+
+def make_app(max_bytes, path_limits=None):
+    app = FastAPI()
+    app.state.reached = []
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=max_bytes, path_limits=path_limits)
+
+    @app.post("/upload/")
+    async def upload(file: UploadFile = File(...)):
+        app.state.reached.append(file.filename)
+        return {"size": len(await file.read())}
+
+    @app.post("/big/")
+    async def big(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return app
+
+def test_declared_length_over_the_limit_is_rejected_before_the_route():
+    app = make_app(1024)
+    response = TestClient(app).post("/upload/", files={"file": ("a.png", b"x" * 4096, "image/png")})
+    assert response.status_code == 413
+    assert "1024" in response.json()["detail"]
+    assert app.state.reached == []
+
+def test_streamed_body_over_the_limit_is_rejected():
+    app = make_app(1024)
+    chunks = (b"x" * 512 for _ in range(8))  # chunked, no Content-Length
+    response = TestClient(app).post("/upload/", content=chunks,
+                                    headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert app.state.reached == []
+
+def test_bodies_within_the_limit_pass():
+    app = make_app(4096)
+    response = TestClient(app).post("/upload/", files={"file": ("a.png", b"x" * 1024, "image/png")})
+    assert response.status_code == 200
+    assert response.json() == {"size": 1024}
+
+def test_path_limits_override_the_default():
+    app = make_app(1024, {"/big/": 16 * 1024})
+    client = TestClient(app)
+    files = {"file": ("a.zip", b"x" * 8192, "application/zip")}
+    assert client.post("/big/", files=files).status_code == 200
+    assert client.post("/upload/", files=files).status_code == 413
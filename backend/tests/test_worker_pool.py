@@ -0,0 +1,112 @@
+"""Admission control: fail-fast rejections, slot release and the 503 response."""
+import asyncio
+import io
+import threading
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from PIL import Image
+
+from src.brain_tumor.database import get_database
+from src.brain_tumor.main import app
+from src.brain_tumor.routes import prediction as routes
+from src.brain_tumor.services.backends import InferenceBackend
+from src.brain_tumor.services.model_service import ModelService
+from src.brain_tumor.services.worker_pool import ServiceOverloadedError, WorkerPool
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (90, 90, 90)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class StubBackend(InferenceBackend):
+    """Fails with ``error`` when set, or blocks until ``release`` is set."""
+    name = "stub"
+
+    def __init__(self, error=None, release=None):
+        super().__init__("memory")
+        self.error = error
+        self.release = release
+        self.started = threading.Event()
+
+    def predict(self, img_batch):
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return np.tile(np.array([[0.7, 0.1, 0.1, 0.1]], dtype=np.float32), (len(img_batch), 1))
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(kind="thread", workers=2, max_pending=1, retry_after=7)
+    yield pool
+    pool.shutdown()
+
+def service_on(pool, backend):
+    service = ModelService(model_path="memory", pool=pool)
+    service.model = backend
+    return service
+
+def test_requests_beyond_max_pending_are_rejected(pool):
+    with pool.admit():
+        with pytest.raises(ServiceOverloadedError) as raised:
+            with pool.admit():
+                pass
+    assert raised.value.retry_after == 7
+    assert pool.stats()["rejected"] == 1
+    with pool.admit():
+        assert pool.pending == 1
+
+def test_slot_is_released_after_a_backend_error(pool):
+    service = service_on(pool, StubBackend(error=ValueError("model exploded")))
+
+    async def scenario():
+        try:
+            with pytest.raises(RuntimeError):
+                await service.predict_image(png_bytes())
+            assert pool.pending == 0
+            service.model.error = None
+            return await service.predict_image(png_bytes())
+        finally:
+            await service.close()
+
+    assert asyncio.run(scenario())["prediction"] == "glioma"
+
+def test_slot_is_released_when_the_request_is_cancelled(pool):
+    release = threading.Event()
+    backend = StubBackend(release=release)
+    service = service_on(pool, backend)
+
+    async def scenario():
+        try:
+            task = asyncio.create_task(service.predict_image(png_bytes()))
+            await asyncio.to_thread(backend.started.wait, 5)
+            assert pool.pending == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert pool.pending == 0
+        finally:
+            release.set()
+            await service.close()
+
+    asyncio.run(scenario())
+
+def test_saturated_pool_answers_503_with_retry_after(pool):
+    service = service_on(pool, StubBackend())
+    app.dependency_overrides[get_database] = lambda: AsyncMongoMockClient()["test_admission"]
+    app.dependency_overrides[routes.select_model] = lambda: service
+    try:
+        with pool.admit():  # another request holds the only slot
+            response = TestClient(app).post(
+                "/api/v1/predict/", files={"file": ("scan.png", png_bytes(), "image/png")}
+            )
+    finally:
+        app.dependency_overrides.pop(get_database, None)
+        app.dependency_overrides.pop(routes.select_model, None)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert "capacity" in response.json()["detail"]
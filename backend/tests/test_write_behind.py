@@ -0,0 +1,142 @@
+"""WriteBehindQueue: size and time flushes, retries, backpressure and draining on close."""
+import asyncio
+import time
+
+from pymongo.errors import BulkWriteError
+
+from src.brain_tumor.services.write_behind import DUPLICATE_KEY, WriteBehindQueue
+
+class FakePredictions:
+    """insert_many that records batches, optionally failing or waiting on a gate first."""
+    def __init__(self, failures=(), gate=None):
+        self.batches = []
+        self.attempts = 0
+        self.failures = list(failures)
+        self.gate = gate
+
+    async def insert_many(self, documents, ordered=True):
+        self.attempts += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.failures:
+            raise self.failures.pop(0)
+        self.batches.append([doc["value"] for doc in documents])
+
+class FakeDatabase:
+    def __init__(self, predictions):
+        self.predictions = predictions
+
+def provider(predictions):
+    db = FakeDatabase(predictions)
+
+    async def get_db():
+        return db
+    return get_db
+
+def docs(values):
+    return [{"value": value} for value in values]
+
+def duplicate_key_error(code=DUPLICATE_KEY):
+    return BulkWriteError({"writeErrors": [{"index": 0, "code": code, "errmsg": "E11000 duplicate key"}]})
+
+def test_full_batch_is_written_without_waiting_for_the_interval():
+    predictions = FakePredictions()
+
+    async def scenario():
+        queue = WriteBehindQueue(provider(predictions), max_batch_size=3, flush_interval_ms=10000)
+        ids = await queue.put_many(docs(range(7)))
+        while len(predictions.batches) < 2:
+            await asyncio.sleep(0.01)
+        written = list(predictions.batches)
+        await queue.close()
+        return ids, written, queue.stats()
+
+    ids, written, stats = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert len(set(ids)) == 7
+    assert written == [[0, 1, 2], [3, 4, 5]]
+    assert predictions.batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert stats["flushed"] == 7 and stats["batches"] == 3 and stats["pending"] == 0
+
+def test_partial_batch_is_written_after_the_flush_interval():
+    predictions = FakePredictions()
+
+    async def scenario():
+        queue = WriteBehindQueue(provider(predictions), max_batch_size=100, flush_interval_ms=30)
+        started = time.perf_counter()
+        await queue.put(docs([1])[0])
+        while not predictions.batches:
+            await asyncio.sleep(0.005)
+        waited = time.perf_counter() - started
+        await queue.close()
+        return waited
+
+    waited = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert 0.025 <= waited < 1.0
+    assert predictions.batches == [[1]]
+
+def test_duplicate_keys_on_retry_count_as_success():
+    # The first attempt fails after the server stored the batch, so the retry hits duplicates
+    predictions = FakePredictions(failures=[ConnectionError("reset"), duplicate_key_error()])
+
+    async def scenario():
+        queue = WriteBehindQueue(provider(predictions), max_batch_size=2, flush_interval_ms=0, max_retries=2)
+        await queue.put_many(docs([1, 2]))
+        await queue.close()
+        return queue.stats()
+
+    stats = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert predictions.attempts == 2
+    assert stats["flushed"] == 2 and stats["dropped"] == 0
+
+def test_batch_is_dropped_after_exhausting_retries():
+    predictions = FakePredictions(failures=[duplicate_key_error(code=121), ConnectionError("reset")])
+    flushed = []
+
+    async def on_flush(db, documents):
+        flushed.extend(documents)
+
+    async def scenario():
+        queue = WriteBehindQueue(provider(predictions), max_batch_size=2, flush_interval_ms=0,
+                                 max_retries=1, on_flush=on_flush)
+        await queue.put_many(docs([1, 2]))
+        await queue.close()
+        return queue.stats()
+
+    stats = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert predictions.attempts == 2
+    assert stats["dropped"] == 2 and stats["flushed"] == 0
+    assert flushed == []
+
+def test_put_waits_once_max_pending_is_reached():
+    async def scenario():
+        predictions = FakePredictions(gate=asyncio.Event())
+        queue = WriteBehindQueue(provider(predictions), max_batch_size=1, flush_interval_ms=0, max_pending=2)
+        await queue.put(docs([0])[0])
+        while predictions.attempts == 0:  # the worker holds the first document while the write hangs
+            await asyncio.sleep(0.005)
+        await queue.put_many(docs([1, 2]))
+        blocked = asyncio.create_task(queue.put(docs([3])[0]))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        assert queue.pending == 2
+
+        predictions.gate.set()
+        await blocked
+        await queue.close()
+        return predictions.batches
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)) == [[0], [1], [2], [3]]
+
+def test_close_writes_everything_queued_then_stops():
+    predictions = FakePredictions()
+
+    async def scenario():
+        queue = WriteBehindQueue(provider(predictions), max_batch_size=2, flush_interval_ms=10000)
+        await queue.put_many(docs(range(5)))
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(asyncio.wait_for(scenario(), 5))
+    # The stop sentinel ends the last partial batch instead of waiting out the interval
+    assert predictions.batches == [[0, 1], [2, 3], [4]]
+    assert queue._worker is None and queue.pending == 0